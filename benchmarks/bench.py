@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for doctotext on synthetic documents.
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --nfib 0x0112 --pieces 1 1000 --chars 1000000 --json out.json
+
+Every combination of nFib, piece count, compressed fraction and document size
+is generated in memory, then timed per stage (container open, stream reads,
+FIB, Clx, decode) and end to end (extract_text, iter_text). Peak memory of
+each end-to-end path is measured separately under tracemalloc.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import doctotext
+from doctotext import builders, decoding, sources, synthetic
+from doctotext.sources import open_ole
+
+
+def best_of(repeat, fn):
+    """returns: (fastest wall time of repeat calls, last return value)"""
+    best, value = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stages(data, repeat):
+    """returns: {stage: seconds} for the steps extract_text performs"""
+    timings = {}
+    timings['open'], ole = best_of(repeat, lambda: open_ole(data))
+    timings['read_word'], word_data = best_of(repeat, lambda: memoryview(ole.openstream('WordDocument').read()))
+    timings['fib'], fib = best_of(repeat, lambda: builders.parse_fib(word_data))
+    timings['read_table'], table_data = best_of(repeat, lambda: memoryview(ole.openstream(fib.table).read()))
+    clx = table_data[fib.fcClx:fib.fcClx + fib.lcbClx]
+    timings['clx'], pieces = best_of(repeat, lambda: builders.parse_clx(clx))
+
+    timings['decode'], _ = best_of(repeat, lambda: decoding.decode_spans(word_data, pieces))
+    ole.close()
+    return timings
+
+
+def run(nfib, pieces, compressed, chars, repeat):
+    text = synthetic.sample_text(chars)
+    data = synthetic.make_doc(text, nfib=nfib, pieces=pieces, compressed=compressed, shuffle=True)
+    row = {'nfib': '0x%04X' % nfib, 'pieces': pieces, 'compressed': compressed,
+           'chars': chars, 'file_bytes': len(data)}
+    row.update(stages(data, repeat))
+    row['extract_text'], _ = best_of(repeat, lambda: doctotext.extract_text(data))
+    row['iter_text'], _ = best_of(repeat, lambda: sum(map(len, doctotext.iter_text(data))))
+    row['peak_extract'] = peak_memory(lambda: doctotext.extract_text(data))
+    row['peak_iter'] = peak_memory(lambda: sum(map(len, doctotext.iter_text(data))))
+    row['mb_per_s'] = len(data) / row['extract_text'] / 1e6
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nfib', nargs='+', default=[hex(n) for n in synthetic.NFIB_LAYOUT])
+    parser.add_argument('--pieces', nargs='+', type=int, default=[1, 100, 10000])
+    parser.add_argument('--compressed', nargs='+', type=float, default=[0.0, 0.5, 1.0])
+    parser.add_argument('--chars', nargs='+', type=int, default=[10000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backend', choices=sources.BACKENDS, default=sources.DEFAULT_BACKEND,
+                        help='compound file reader used for every path')
+    parser.add_argument('--json', help='also write the rows to this file')
+    args = parser.parse_args(argv)
+    sources.DEFAULT_BACKEND = args.backend
+
+    columns = ['nfib', 'pieces', 'compressed', 'chars', 'open', 'read_word', 'fib', 'read_table',
+               'clx', 'decode', 'extract_text', 'iter_text', 'mb_per_s', 'peak_extract', 'peak_iter']
+    print(' '.join('%12s' % c[:12] for c in columns))
+    rows = []
+    for nfib, pieces, compressed, chars in itertools.product(
+            [int(n, 16) for n in args.nfib], args.pieces, args.compressed, args.chars):
+        if pieces > chars:
+            continue
+        row = run(nfib, pieces, compressed, chars, args.repeat)
+        rows.append(row)
+        print(' '.join('%12.6f' % row[c] if isinstance(row[c], float) and c != 'compressed' else '%12s' % row[c]
+                       for c in columns), flush=True)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,53 +9,164 @@
 #############################################################
 # Written by William Kinsman. Please fork / modify / fix as needed.
 
-import olefile
-from doctotext import builders
-from doctotext.utilities import find_value_by_key
+from time import perf_counter
+from doctotext import builders, cleaning, decoding
+from doctotext.batch import Hits, Result, extract_many, search_many
+from doctotext.cache import Cache
+from doctotext.chunking import Chunk, iter_chunks
+from doctotext.document import Document
+from doctotext.errors import Corrupt, DocError, Encrypted, LimitExceeded, UnsupportedVersion
+from doctotext.instrument import Collector, Stats
+from doctotext.limits import DEFAULT_LIMITS, Limits
+from doctotext.scanning import Hit, iter_hits, search
+from doctotext.sources import open_ole, open_stream
+from doctotext.triage import Sniff, sniff
 
-def extract_text(path: str):
+__version__ = '0.2.0'
+
+def extract_text(source, stats: Stats = None, stories=None, clean: bool = False, limits: Limits = None):
     """
-    @param path: path to *.doc file
-    returns: list of text spans in document
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param stats: optional Stats filled in with per-stage measurements
+    @param stories: optional story names ('main', 'footnotes', 'headers', 'comments',
+                    'endnotes', 'textboxes', 'header_textboxes'), or 'all'
+    @param clean: drop field instructions and map Word control characters (see cleaning)
+    @param limits: optional Limits, defaults to DEFAULT_LIMITS
+    returns: list of text spans in document, or {story: text} when stories is given
+    raises: errors.DocError subclasses for unsupported, encrypted, corrupt or over-limit files
     """
+    if stories is not None:
+        with Document(source, limits) as document:
+            output = document.extract_stories(None if stories == 'all' else stories)
+        return {k: cleaning.clean(v) for k, v in output.items()} if clean else output
+    spans = _extract(source, stats, limits)[1]
+    return cleaning.clean_spans(spans) if clean else spans
+
+
+def _extract(source, stats=None, limits=None):
+    """returns: (Fib, list of text spans) of the document"""
+    limits = (limits or DEFAULT_LIMITS).start()
+    if stats is not None:
+        mark = perf_counter()
+    ole = open_ole(source)
     try:
-        # fetch word_data
-        ole = olefile.OleFileIO(path)
-        word_stream = ole.openstream('WordDocument')
-        word_data = word_stream.read()
-        assert len(word_data) <= 0x7FFFFFFF
-    
+        if stats is not None:
+            mark = stats.mark('open', mark)
+
+        # fetch word_data; all further slices are views into it
+        word_data = memoryview(_read_stream(ole, 'WordDocument', limits))
+        if stats is not None:
+            stats.bytes_read += len(word_data)
+            mark = stats.mark('read_word', mark)
+
         # build the fib
-        fib = builders.build_fib(word_data)
-        
+        fib = builders.check_encryption(builders.parse_fib(word_data))
+        if stats is not None:
+            stats.nfib = fib.nFib
+            mark = stats.mark('fib', mark)
+
         # fetch table_data
-        table_data = ole.openstream(fib['_table']).read()
-        assert len(table_data) <= 0x7FFFFFFF
-        
-        # build the clx
-        fcclx = find_value_by_key(fib, 'fcClx')
-        lcbclx = find_value_by_key(fib, 'lcbClx')
-        clx = builders.build_clx(table_data[fcclx:fcclx+lcbclx])
-    except:
-        assert False, "Error in parsing. Aborting."
-    
-    # build text ranges
-    text = []
-    for i in range(len(clx['Pcdt']['PlcPcd']['aCP'])-1):
-        aCp_i     = clx['Pcdt']['PlcPcd']['aCP'][i]
-        aCp_i_end = clx['Pcdt']['PlcPcd']['aCP'][i + 1]
-        pcd       = clx['Pcdt']['PlcPcd']['aPcd'][i]
-        
-        # uncompressed text
-        if pcd['fc']['fCompressed'] == 0:
-            offset_s = pcd['fc']['fc']
-            offset_e = offset_s + (2 * (aCp_i_end - aCp_i))
-            text.append(word_data[offset_s:offset_e].decode("utf-16", errors='ignore'))
-        
-        # compressed text
-        else:
-            offset_s = (pcd['fc']['fc'] // 2)
-            offset_e = offset_s + (aCp_i_end - aCp_i)
-            text.append(word_data[offset_s:offset_e].decode('cp1252', errors='ignore'))
-    ole.close()
-    return text
\ No newline at end of file
+        limits.check_deadline()
+        table_data = memoryview(_read_stream(ole, fib.table, limits))
+        if stats is not None:
+            stats.bytes_read += len(table_data)
+            mark = stats.mark('read_table', mark)
+
+        # build the piece table
+        if fib.fcClx + fib.lcbClx > len(table_data):
+            raise Corrupt("Clx runs past the end of the %s stream" % fib.table)
+        pieces = builders.parse_clx(table_data[fib.fcClx:fib.fcClx+fib.lcbClx], limits)
+        limits.check_chars(pieces.cp[-1] if len(pieces.cp) else 0)
+        builders.check_piece_table(pieces, len(word_data))
+        if stats is not None:
+            stats.count_pieces(pieces)
+            mark = stats.mark('clx', mark)
+
+        # decode coalesced runs of pieces
+        text = decoding.decode_spans(word_data, pieces, limits)
+    finally:
+        ole.close()
+    if stats is not None:
+        stats.mark('decode', mark)
+    return fib, text
+
+
+def _read_stream(ole, name, limits):
+    """returns: the whole stream, after checking its size against limits"""
+    return open_stream(ole, name, limits).read()
+
+
+def iter_text(source, chunk_chars: int = 0x10000, stats: Stats = None, clean: bool = False,
+              limits: Limits = None):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param chunk_chars: maximum number of characters read and decoded at once
+    @param clean: drop field instructions and map Word control characters (see cleaning)
+    @param stats: optional Stats filled in with per-stage measurements; decode
+                  time excludes time spent by the consumer between chunks
+    @param limits: optional Limits, checked before the first chunk and per step
+    yields: text of the document in order, in chunks of at most chunk_chars
+    """
+    cleaner = cleaning.Cleaner() if clean else None
+    for _, _, chunk in _iter_segments(source, chunk_chars, stats, limits):
+        if cleaner is not None:
+            chunk = cleaner.feed(chunk)
+        if chunk:
+            yield chunk
+
+
+def _iter_segments(source, chunk_chars, stats=None, limits=None):
+    """
+    Reads the document piece run by piece run, in bounded steps.
+    yields: (cp_start, cp_end, text) for each decoded step
+    """
+    if stats is not None:
+        mark = perf_counter()
+    document = Document(source, limits)
+    if stats is not None:
+        mark = stats.mark('open', mark)
+    try:
+        # only the FIB and the Clx are read up front
+        fib = document.fib
+        if stats is not None:
+            stats.nfib = fib.nFib
+            stats.bytes_read += fib.size
+            mark = stats.mark('fib', mark)
+        pieces = document.piece_table
+        if stats is not None:
+            stats.bytes_read += fib.lcbClx
+            stats.count_pieces(pieces)
+            mark = stats.mark('clx', mark)
+        yield from document.iter_segments(chunk_chars, stats)
+    finally:
+        document.close()
+
+
+def extract_to(source, fileobj, chunk_chars: int = 0x10000, clean: bool = False):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param fileobj: binary file-like object receiving UTF-8 text
+    @param chunk_chars: maximum number of characters held in memory at once
+    @param clean: see iter_text
+    returns: number of characters written
+    """
+    count = 0
+    for chunk in iter_text(source, chunk_chars=chunk_chars, clean=clean):
+        fileobj.write(chunk.encode('utf-8'))
+        count += len(chunk)
+    return count
+
+
+
+def extract_range(source, cp_start: int, cp_end: int):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object,
+                   or an open Document to reuse its parsed piece table
+    @param cp_start: first character position
+    @param cp_end: character position to stop before
+    returns: text of the character range [cp_start, cp_end)
+    """
+    if isinstance(source, Document):
+        return source.extract_range(cp_start, cp_end)
+    with Document(source) as document:
+        return document.extract_range(cp_start, cp_end)
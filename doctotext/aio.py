@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+import doctotext
+
+
+class Extractor:
+    """
+    Runs the blocking extraction functions on a bounded pool. At most `limit`
+    conversions are in flight at once; further calls wait their turn.
+    Pass a ProcessPoolExecutor as `executor` to move extract_text off the
+    event loop's process entirely; iter_text always steps on threads.
+    """
+
+    def __init__(self, limit: int = None, max_workers: int = None, executor=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.limit = limit or self.max_workers
+        self._threads = ThreadPoolExecutor(self.max_workers, thread_name_prefix='doctotext')
+        self._executor = executor or self._threads
+        self._semaphore = None
+        self._loop = None
+
+    def _slot(self):
+        # asyncio primitives are bound to one loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def extract_text(self, source):
+        """
+        @param source: anything doctotext.extract_text accepts, an object with an
+                       async read() method, or an async iterable of bytes
+        returns: list of text spans in document
+        """
+        async with self._slot():
+            source = await read_source(source)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, doctotext.extract_text, source)
+
+    async def iter_text(self, source, chunk_chars: int = 0x10000):
+        """
+        @param source: see extract_text
+        @param chunk_chars: maximum number of characters per chunk
+        yields: text of the document in order
+        """
+        async with self._slot():
+            source = await read_source(source)
+            loop = asyncio.get_running_loop()
+            chunks = doctotext.iter_text(source, chunk_chars=chunk_chars)
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(self._threads, next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                try:
+                    chunks.close()
+                except ValueError:
+                    # still running in a worker after cancellation; it closes on collection
+                    pass
+
+    def close(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+async def read_source(source):
+    """
+    @param source: object with an async read() method, async iterable of bytes,
+                   or any synchronous source (returned unchanged)
+    returns: source usable by the synchronous API
+    """
+    read = getattr(source, 'read', None)
+    if read is not None and inspect.iscoroutinefunction(read):
+        parts = []
+        while True:
+            part = await read(0x10000)
+            if not part:
+                break
+            parts.append(part)
+        return b''.join(parts)
+    if hasattr(source, '__aiter__'):
+        return b''.join([part async for part in source])
+    return source
+
+
+_default = None
+
+
+def configure(limit: int = None, max_workers: int = None, executor=None):
+    """
+    Replaces the Extractor used by the module-level functions.
+    returns: the new Extractor
+    """
+    global _default
+    if _default is not None:
+        _default.close()
+    _default = Extractor(limit=limit, max_workers=max_workers, executor=executor)
+    return _default
+
+
+def _extractor():
+    return _default if _default is not None else configure()
+
+
+async def extract_text(source):
+    """Async doctotext.extract_text on the default Extractor."""
+    return await _extractor().extract_text(source)
+
+
+async def iter_text(source, chunk_chars: int = 0x10000):
+    """Async doctotext.iter_text on the default Extractor."""
+    async for chunk in _extractor().iter_text(source, chunk_chars=chunk_chars):
+        yield chunk
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import tempfile
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import partial
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
+import doctotext
+from doctotext import scanning
+
+
+class Result(namedtuple('Result', ['index', 'source', 'text', 'nfib', 'error', 'seconds'])):
+    """
+    Outcome of one extraction in a batch.
+    index: position of the source in the input iterable
+    source: the source if it was a path, else None
+    text: extracted text, or None on failure
+    nfib: nFib of the document, or None on failure
+    error: (exception type name, message), or None on success
+    seconds: wall time spent extracting in the worker
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Hits(namedtuple('Hits', ['index', 'source', 'hits', 'error', 'seconds'])):
+    """
+    Outcome of one search in a batch; hits is a list of scanning.Hit, or None on failure.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def extract_many(sources, workers: int = None, executor: str = 'process', ordered: bool = True,
+                 chunksize: int = 8, handoff: str = None, handoff_threshold: int = 1 << 20,
+                 limits=None):
+    """
+    @param sources: iterable of anything extract_text accepts; with a process pool,
+                    sources other than paths, bytes and bytearrays (file objects,
+                    memoryviews, mmaps) are read into bytes before they are sent
+    @param workers: pool size, defaults to os.cpu_count()
+    @param executor: 'process' or 'thread'
+    @param ordered: yield results in input order rather than completion order
+    @param chunksize: number of sources sent to a worker per task
+    @param handoff: None, 'shm' or 'file'; with a process pool, texts of at least
+                    handoff_threshold bytes are returned through shared memory or a
+                    temp file instead of being pickled
+    @param limits: optional limits.Limits applied to each document, so hostile
+                   files fail with LimitExceeded instead of stalling a worker
+    yields: Result per source, including an error Result for every source of a
+            chunk whose worker died or that could not be sent to a worker
+    """
+    workers = workers or os.cpu_count() or 1
+    if handoff not in {None, 'shm', 'file'}:
+        raise ValueError("handoff must be None, 'shm' or 'file'")
+    if executor == 'thread':
+        handoff = None
+    make_pool = _pool_factory(executor, workers, shm=handoff == 'shm')
+    results = _map(make_pool, workers, _sendable(sources, executor), ordered, chunksize,
+                   _run_chunk, handoff, handoff_threshold, limits,
+                   failed=_failed_result, release=_release)
+    try:
+        for result in results:
+            yield _receive(result)
+    finally:
+        # frees the handoffs of results the consumer stopped before reaching
+        results.close()
+
+
+def search_many(sources, patterns, first_only: bool = False, ignore_case: bool = False,
+                workers: int = None, executor: str = 'process', ordered: bool = True,
+                chunksize: int = 8, limits=None):
+    """
+    Runs scanning.search over many documents; with first_only, each worker stops
+    decoding a document at its first hit.
+    @param patterns: keyword strings and/or compiled regexes, see scanning.search
+    yields: Hits per source; see extract_many for the other parameters
+    """
+    workers = workers or os.cpu_count() or 1
+    make_pool = _pool_factory(executor, workers)
+    yield from _map(make_pool, workers, _sendable(sources, executor), ordered, chunksize,
+                    _search_chunk, patterns, first_only, ignore_case, limits, failed=_failed_hits)
+
+
+def _pool_factory(executor, workers, shm=False):
+    """returns: callable creating a pool, so a broken process pool can be replaced"""
+    if executor == 'process':
+        if shm:
+            # workers must share our tracker, or their segments get unlinked when they exit
+            resource_tracker.ensure_running()
+        return partial(ProcessPoolExecutor, workers)
+    if executor == 'thread':
+        return partial(ThreadPoolExecutor, workers)
+    raise ValueError("executor must be 'process' or 'thread'")
+
+
+def _sendable(sources, executor):
+    """yields: sources, with the ones a process pool cannot pickle read into bytes"""
+    for source in sources:
+        if executor == 'process':
+            if isinstance(source, (memoryview, mmap.mmap)):
+                source = bytes(source)
+            elif hasattr(source, 'read') and hasattr(source, 'seek'):
+                source.seek(0)
+                source = source.read()
+        yield source
+
+
+def _map(make_pool, workers, sources, ordered, chunksize, task, *args, failed, release=None):
+    """
+    @param make_pool: returns a new executor; called again if a process pool breaks
+    @param failed: failed(index, source, exception) builds the result reported for each
+                   source of a chunk whose task raised instead of returning
+    @param release: called on every result that is never yielded, when the consumer
+                    stops early
+    yields: the results of task(chunk, *args) for chunks of (index, source), flattened
+    """
+    # keep a bounded number of chunks in flight so huge inputs stream through
+    sources = enumerate(sources)
+    pool = make_pool()
+    pools = [pool]
+    pending = deque()
+    results = iter(())
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(sources, chunksize))
+                if not chunk:
+                    break
+                try:
+                    future = pool.submit(task, chunk, *args)
+                except BrokenExecutor:
+                    pool = make_pool()
+                    pools.append(pool)
+                    future = pool.submit(task, chunk, *args)
+                pending.append((future, chunk, pool))
+            if not pending:
+                break
+            if ordered:
+                future, chunk, owner = pending.popleft()
+            else:
+                done, _ = wait([entry[0] for entry in pending], return_when=FIRST_COMPLETED)
+                entry = next(entry for entry in pending if entry[0] in done)
+                pending.remove(entry)
+                future, chunk, owner = entry
+            try:
+                results = iter(future.result())
+            except Exception as e:
+                # a worker that died (e.g. OOM-killed) or a chunk that could not be
+                # pickled fails only the sources of that chunk
+                results = iter([failed(index, source, e) for index, source in chunk])
+                if isinstance(e, BrokenExecutor) and owner is pool:
+                    pool = make_pool()
+                    pools.append(pool)
+            yield from results
+    finally:
+        for future, _, _ in pending:
+            future.cancel()
+        for owner in pools:
+            owner.shutdown(wait=True, cancel_futures=True)
+        if release is not None:
+            # the rest of the current chunk, then chunks finished or still running at close
+            for result in results:
+                release(result)
+            for future, _, _ in pending:
+                if not future.cancelled() and future.exception() is None:
+                    for result in future.result():
+                        release(result)
+
+
+def _label(source):
+    return source if isinstance(source, (str, os.PathLike)) else None
+
+
+def _failed_result(index, source, error):
+    return Result(index, _label(source), None, None, (type(error).__name__, str(error)), 0.0)
+
+
+def _failed_hits(index, source, error):
+    return Hits(index, _label(source), None, (type(error).__name__, str(error)), 0.0)
+
+
+def _search_chunk(chunk, patterns, first_only, ignore_case, limits):
+    output = []
+    for index, source in chunk:
+        label = _label(source)
+        start = time.perf_counter()
+        try:
+            hits = scanning.search(source, patterns, first_only=first_only,
+                                   ignore_case=ignore_case, limits=limits)
+        except Exception as e:
+            output.append(Hits(index, label, None, (type(e).__name__, str(e)), time.perf_counter() - start))
+        else:
+            output.append(Hits(index, label, hits, None, time.perf_counter() - start))
+    return output
+
+
+def _run_chunk(chunk, handoff, handoff_threshold, limits=None):
+    return [_run_one(index, source, handoff, handoff_threshold, limits) for index, source in chunk]
+
+
+def _run_one(index, source, handoff, handoff_threshold, limits=None):
+    label = _label(source)
+    start = time.perf_counter()
+    try:
+        fib, spans = doctotext._extract(source, limits=limits)
+    except Exception as e:
+        return Result(index, label, None, None, (type(e).__name__, str(e)), time.perf_counter() - start)
+    text = ''.join(spans)
+    seconds = time.perf_counter() - start
+    if handoff is None or len(text) < handoff_threshold:
+        return Result(index, label, text, fib.nFib, None, seconds)
+
+    # hand large outputs back out of band; only the handle is pickled
+    data = text.encode('utf-8')
+    if handoff == 'shm':
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        shm.close()
+        return Result(index, label, ('shm', shm.name, len(data)), fib.nFib, None, seconds)
+    fd, name = tempfile.mkstemp(prefix='doctotext-', suffix='.txt')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return Result(index, label, ('file', name, len(data)), fib.nFib, None, seconds)
+
+
+def _release(result):
+    """Frees a handed-off text that will not be received."""
+    if not isinstance(result.text, tuple):
+        return
+    kind, name, _ = result.text
+    try:
+        if kind == 'shm':
+            shm = shared_memory.SharedMemory(name=name)
+            shm.close()
+            shm.unlink()
+        else:
+            os.remove(name)
+    except FileNotFoundError:
+        pass
+
+
+def _receive(result):
+    """Resolves a handed-off text in the parent process."""
+    if not isinstance(result.text, tuple):
+        return result
+    kind, name, size = result.text
+    if kind == 'shm':
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            text = bytes(shm.buf[:size]).decode('utf-8')
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        try:
+            with open(name, 'rb') as f:
+                text = f.read().decode('utf-8')
+        finally:
+            os.remove(name)
+    return result._replace(text=text)
@@ -1,338 +1,441 @@
 # -*- coding: utf-8 -*-
 
+import struct
+import sys
+from array import array
+from doctotext.errors import Corrupt, Encrypted, UnsupportedVersion
+from doctotext.records import record
 from doctotext.utilities import formatted_hex
 
-def build_fib(bytecode):
-    
-    output = {}
-    offset = 0
+##############################################################
+# FIB field tables. Each section is compiled once into a     #
+# single struct so it decodes with one unpack_from call.     #
+##############################################################
+
+FibBase = record('FibBase', [
+    ('wIdent', 'H'), ('nFib', 'H'), ('unused', 'H'), ('lid', 'H'), ('pnNext', 'H'),
+    ('bit_flags', 'H'),  # 16 bits covering multiple fields
+    ('nFibBack', 'H'), ('lKey', 'I'), ('envr', 'B'), ('extra_flags', 'B'),
+    ('reserved3', 'H'), ('reserved4', 'H'), ('reserved5', 'I'), ('reserved6', 'I')],
+    bits={
+        'bit_flags': [
+            ('fDot', 0, 1), ('fGlsy', 1, 1), ('fComplex', 2, 1), ('fHasPic', 3, 1),
+            ('cQuickSaves', 4, 4), ('fEncrypted', 8, 1), ('fWhichTblStm', 9, 1),
+            ('fReadOnlyRecommended', 10, 1), ('fWriteReservation', 11, 1),
+            ('fExtChar', 12, 1), ('fLoadOverride', 13, 1), ('fFarEast', 14, 1),
+            ('fObfuscated', 15, 1)],
+        'extra_flags': [
+            ('fMac', 0, 1), ('fEmptySpecial', 1, 1), ('fLoadOverridePage', 2, 1),
+            ('reserved1', 3, 1), ('reserved2', 4, 1), ('fSpare0', 5, 3)]})
+
+FibRgW97 = record('FibRgW97', [
+    ('reserved1', 'H'), ('reserved2', 'H'), ('reserved3', 'H'), ('reserved4', 'H'),
+    ('reserved5', 'H'), ('reserved6', 'H'), ('reserved7', 'H'), ('reserved8', 'H'),
+    ('reserved9', 'H'), ('reserved10', 'H'), ('reserved11', 'H'), ('reserved12', 'H'),
+    ('reserved13', 'H'), ('lidFE', 'H')])
+
+FibRgLw97 = record('FibRgLw97', [
+    ('cbMac', 'i'), ('reserved1', 'i'), ('reserved2', 'i'), ('ccpText', 'i'),
+    ('ccpFtn', 'i'), ('ccpHdd', 'i'), ('reserved3', 'i'), ('ccpAtn', 'i'),
+    ('ccpEdn', 'i'), ('ccpTxbx', 'i'), ('ccpHdrTxbx', 'i'), ('reserved4', 'i'),
+    ('reserved5', 'i'), ('reserved6', 'i'), ('reserved7', 'i'), ('reserved8', 'i'),
+    ('reserved9', 'i'), ('reserved10', 'i'), ('reserved11', 'i'), ('reserved12', 'i'),
+    ('reserved13', 'i'), ('reserved14', 'i')])
+
+FibRgFcLcb97 = record('FibRgFcLcb97', [(key, 'I') for key in [
+    "fcStshfOrig", "lcbStshfOrig", "fcStshf", "lcbStshf", "fcPlcffndRef", "lcbPlcffndRef",
+    "fcPlcffndTxt", "lcbPlcffndTxt", "fcPlcfandRef", "lcbPlcfandRef", "fcPlcfandTxt", "lcbPlcfandTxt",
+    "fcPlcfSed", "lcbPlcfSed", "fcPlcPad", "lcbPlcPad", "fcPlcfPhe", "lcbPlcfPhe", "fcSttbfGlsy", "lcbSttbfGlsy",
+    "fcPlcfGlsy", "lcbPlcfGlsy", "fcPlcfHdd", "lcbPlcfHdd", "fcPlcfBteChpx", "lcbPlcfBteChpx", "fcPlcfBtePapx",
+    "lcbPlcfBtePapx", "fcPlcfSea", "lcbPlcfSea", "fcSttbfFfn", "lcbSttbfFfn", "fcPlcfFldMom", "lcbPlcfFldMom",
+    "fcPlcfFldHdr", "lcbPlcfFldHdr", "fcPlcfFldFtn", "lcbPlcfFldFtn", "fcPlcfFldAtn", "lcbPlcfFldAtn",
+    "fcPlcfFldMcr", "lcbPlcfFldMcr", "fcSttbfBkmk", "lcbSttbfBkmk", "fcPlcfBkf", "lcbPlcfBkf", "fcPlcfBkl",
+    "lcbPlcfBkl", "fcCmds", "lcbCmds", "fcUnused1", "lcbUnused1", "fcSttbfMcr", "lcbSttbfMcr", "fcPrDrvr",
+    "lcbPrDrvr", "fcPrEnvPort", "lcbPrEnvPort", "fcPrEnvLand", "lcbPrEnvLand", "fcWss", "lcbWss", "fcDop",
+    "lcbDop", "fcSttbfAssoc", "lcbSttbfAssoc", "fcClx", "lcbClx", "fcPlcfPgdFtn", "lcbPlcfPgdFtn",
+    "fcAutosaveSource", "lcbAutosaveSource", "fcGrpXstAtnOwners", "lcbGrpXstAtnOwners", "fcSttbfAtnBkmk",
+    "lcbSttbfAtnBkmk", "fcUnused2", "lcbUnused2", "fcUnused3", "lcbUnused3", "fcPlcSpaMom", "lcbPlcSpaMom",
+    "fcPlcSpaHdr", "lcbPlcSpaHdr", "fcPlcfAtnBkf", "lcbPlcfAtnBkf", "fcPlcfAtnBkl", "lcbPlcfAtnBkl", "fcPms",
+    "lcbPms", "fcFormFldSttbs", "lcbFormFldSttbs", "fcPlcfendRef", "lcbPlcfendRef", "fcPlcfendTxt",
+    "lcbPlcfendTxt", "fcPlcfFldEdn", "lcbPlcfFldEdn", "fcUnused4", "lcbUnused4", "fcDggInfo", "lcbDggInfo",
+    "fcSttbfRMark", "lcbSttbfRMark", "fcSttbfCaption", "lcbSttbfCaption", "fcSttbfAutoCaption",
+    "lcbSttbfAutoCaption", "fcPlcfWkb", "lcbPlcfWkb", "fcPlcfSpl", "lcbPlcfSpl", "fcPlcftxbxTxt",
+    "lcbPlcftxbxTxt", "fcPlcfFldTxbx", "lcbPlcfFldTxbx", "fcPlcfHdrtxbxTxt", "lcbPlcfHdrtxbxTxt",
+    "fcPlcffldHdrTxbx", "lcbPlcffldHdrTxbx", "fcStwUser", "lcbStwUser", "fcSttbTtmbd", "lcbSttbTtmbd",
+    "fcCookieData", "lcbCookieData", "fcPgdMotherOldOld", "lcbPgdMotherOldOld", "fcBkdMotherOldOld",
+    "lcbBkdMotherOldOld", "fcPgdFtnOldOld", "lcbPgdFtnOldOld", "fcBkdFtnOldOld", "lcbBkdFtnOldOld",
+    "fcPgdEdnOldOld", "lcbPgdEdnOldOld", "fcBkdEdnOldOld", "lcbBkdEdnOldOld", "fcSttbfIntlFld", "lcbSttbfIntlFld",
+    "fcRouteSlip", "lcbRouteSlip", "fcSttbSavedBy", "lcbSttbSavedBy", "fcSttbFnm", "lcbSttbFnm", "fcPlfLst",
+    "lcbPlfLst", "fcPlfLfo", "lcbPlfLfo", "fcPlcfTxbxBkd", "lcbPlcfTxbxBkd", "fcPlcfTxbxHdrBkd",
+    "lcbPlcfTxbxHdrBkd", "fcDocUndoWord9", "lcbDocUndoWord9", "fcRgbUse", "lcbRgbUse", "fcUsp", "lcbUsp",
+    "fcUskf", "lcbUskf", "fcPlcupcRgbUse", "lcbPlcupcRgbUse", "fcPlcupcUsp", "lcbPlcupcUsp", "fcSttbGlsyStyle",
+    "lcbSttbGlsyStyle", "fcPlgosl", "lcbPlgosl", "fcPlcocx", "lcbPlcocx", "fcPlcfBteLvc", "lcbPlcfBteLvc",
+    "dwLowDateTime", "dwHighDateTime", "fcPlcfLvcPre10", "lcbPlcfLvcPre10", "fcPlcfAsumy", "lcbPlcfAsumy",
+    "fcPlcfGram", "lcbPlcfGram", "fcSttbListNames", "lcbSttbListNames", "fcSttbfUssr", "lcbSttbfUssr"]])
+
+FibRgFcLcb2000 = record('FibRgFcLcb2000', [(key, 'I') for key in [
+    'fcPlcfTch', 'lcbPlcfTch', 'fcRmdThreading', 'lcbRmdThreading',
+    'fcMid', 'lcbMid', 'fcSttbRgtplc', 'lcbSttbRgtplc',
+    'fcMsoEnvelope', 'lcbMsoEnvelope', 'fcPlcfLad', 'lcbPlcfLad',
+    'fcRgDofr', 'lcbRgDofr', 'fcPlcosl', 'lcbPlcosl', 'fcPlcfCookieOld',
+    'lcbPlcfCookieOld', 'fcPgdMotherOld', 'lcbPgdMotherOld',
+    'fcBkdMotherOld', 'lcbBkdMotherOld', 'fcPgdFtnOld',
+    'lcbPgdFtnOld', 'fcBkdFtnOld', 'lcbBkdFtnOld', 'fcPgdEdnOld',
+    'lcbPgdEdnOld', 'fcBkdEdnOld', 'lcbBkdEdnOld']])
+
+FibRgFcLcb2002 = record('FibRgFcLcb2002', [(key, 'I') for key in [
+    'fcUnused1', 'lcbUnused1', 'fcPlcfPgp', 'lcbPlcfPgp', 'fcPlcfuim',
+    'lcbPlcfuim', 'fcPlfguidUim', 'lcbPlfguidUim', 'fcAtrdExtra',
+    'lcbAtrdExtra', 'fcPlrsid', 'lcbPlrsid', 'fcSttbfBkmkFactoid',
+    'lcbSttbfBkmkFactoid', 'fcPlcfBkfFactoid', 'lcbPlcfBkfFactoid',
+    'fcPlcfcookie', 'lcbPlcfcookie', 'fcPlcfBklFactoid',
+    'lcbPlcfBklFactoid', 'fcFactoidData', 'lcbFactoidData', 'fcDocUndo',
+    'lcbDocUndo', 'fcSttbfBkmkFcc', 'lcbSttbfBkmkFcc', 'fcPlcfBkfFcc',
+    'lcbPlcfBkfFcc', 'fcPlcfBklFcc', 'lcbPlcfBklFcc',
+    'fcSttbfbkmkBPRepairs', 'lcbSttbfbkmkBPRepairs', 'fcPlcfbkfBPRepairs',
+    'lcbPlcfbkfBPRepairs', 'fcPlcfbklBPRepairs', 'lcbPlcfbklBPRepairs',
+    'fcPmsNew', 'lcbPmsNew', 'fcODSO', 'lcbODSO', 'fcPlcfpmiOldXP',
+    'lcbPlcfpmiOldXP', 'fcPlcfpmiNewXP', 'lcbPlcfpmiNewXP',
+    'fcPlcfpmiMixedXP', 'lcbPlcfpmiMixedXP', 'fcUnused2', 'lcbUnused2',
+    'fcPlcffactoid', 'lcbPlcffactoid', 'fcPlcflvcOldXP', 'lcbPlcflvcOldXP',
+    'fcPlcflvcNewXP', 'lcbPlcflvcNewXP', 'fcPlcflvcMixedXP',
+    'lcbPlcflvcMixedXP']])
+
+FibRgFcLcb2003 = record('FibRgFcLcb2003', [(key, 'I') for key in [
+    'fcHplxsdr', 'lcbHplxsdr', 'fcSttbfBkmkSdt', 'lcbSttbfBkmkSdt',
+    'fcPlcfBkfSdt', 'lcbPlcfBkfSdt', 'fcPlcfBklSdt', 'lcbPlcfBklSdt',
+    'fcCustomXForm', 'lcbCustomXForm', 'fcSttbfBkmkProt',
+    'lcbSttbfBkmkProt', 'fcPlcfBkfProt', 'lcbPlcfBkfProt',
+    'fcPlcfBklProt', 'lcbPlcfBklProt', 'fcSttbProtUser',
+    'lcbSttbProtUser', 'fcUnused', 'lcbUnused', 'fcPlcfpmiOld',
+    'lcbPlcfpmiOld', 'fcPlcfpmiOldInline', 'lcbPlcfpmiOldInline',
+    'fcPlcfpmiNew', 'lcbPlcfpmiNew', 'fcPlcfpmiNewInline',
+    'lcbPlcfpmiNewInline', 'fcPlcflvcOld', 'lcbPlcflvcOld',
+    'fcPlcflvcOldInline', 'lcbPlcflvcOldInline', 'fcPlcflvcNew',
+    'lcbPlcflvcNew', 'fcPlcflvcNewInline', 'lcbPlcflvcNewInline',
+    'fcPgdMother', 'lcbPgdMother', 'fcBkdMother', 'lcbBkdMother',
+    'fcAfdMother', 'lcbAfdMother', 'fcPgdFtn', 'lcbPgdFtn',
+    'fcBkdFtn', 'lcbBkdFtn', 'fcAfdFtn', 'lcbAfdFtn', 'fcPgdEdn',
+    'lcbPgdEdn', 'fcBkdEdn', 'lcbBkdEdn', 'fcAfdEdn', 'lcbAfdEdn',
+    'fcAfd', 'lcbAfd']])
+
+FibRgFcLcb2007 = record('FibRgFcLcb2007', [(key, 'I') for key in [
+    'fcPlcfmthd', 'lcbPlcfmthd', 'fcSttbfBkmkMoveFrom',
+    'lcbSttbfBkmkMoveFrom', 'fcPlcfBkfMoveFrom',
+    'lcbPlcfBkfMoveFrom', 'fcPlcfBklMoveFrom', 'lcbPlcfBklMoveFrom',
+    'fcSttbfBkmkMoveTo', 'lcbSttbfBkmkMoveTo', 'fcPlcfBkfMoveTo',
+    'lcbPlcfBkfMoveTo', 'fcPlcfBklMoveTo', 'lcbPlcfBklMoveTo',
+    'fcUnused1', 'lcbUnused1', 'fcUnused2', 'lcbUnused2',
+    'fcUnused3', 'lcbUnused3', 'fcSttbfBkmkArto', 'lcbSttbfBkmkArto',
+    'fcPlcfBkfArto', 'lcbPlcfBkfArto', 'fcPlcfBklArto',
+    'lcbPlcfBklArto', 'fcArtoData', 'lcbArtoData', 'fcUnused4',
+    'lcbUnused4', 'fcUnused5', 'lcbUnused5', 'fcUnused6',
+    'lcbUnused6', 'fcOssTheme', 'lcbOssTheme',
+    'fcColorSchemeMapping', 'lcbColorSchemeMapping']])
+
+FibRgCswNew2000 = record('FibRgCswNew2000', [('nFibNew', 'H'), ('cQuickSavesNew', 'H')])
+
+FibRgCswNew2007 = record('FibRgCswNew2007', [
+    ('nFibNew', 'H'), ('cQuickSavesNew', 'H'),
+    ('lidThemeOther', 'H'), ('lidThemeFE', 'H'), ('lidThemeCS', 'H')])
+
+U16 = record('U16', [('value', 'H')])
+U32 = record('U32', [('value', 'I')])
+I16 = record('I16', [('value', 'h')])
+
+# fibRgFcLcb sections present for each nFib, in stream order
+FCLCB_SECTIONS = {
+    0x00C1: (FibRgFcLcb97,),
+    0x00D9: (FibRgFcLcb97, FibRgFcLcb2000),
+    0x0101: (FibRgFcLcb97, FibRgFcLcb2000, FibRgFcLcb2002),
+    0x010C: (FibRgFcLcb97, FibRgFcLcb2000, FibRgFcLcb2002, FibRgFcLcb2003),
+    0x0112: (FibRgFcLcb97, FibRgFcLcb2000, FibRgFcLcb2002, FibRgFcLcb2003, FibRgFcLcb2007)}
+
+# stories in CP order, with the fibRgLw count giving each one's length
+STORIES = (
+    ('main', 'ccpText'), ('footnotes', 'ccpFtn'), ('headers', 'ccpHdd'),
+    ('comments', 'ccpAtn'), ('endnotes', 'ccpEdn'), ('textboxes', 'ccpTxbx'),
+    ('header_textboxes', 'ccpHdrTxbx'))
+
+# compatibility-view key under which each section nests the previous one
+_FCLCB_NESTING = {
+    FibRgFcLcb2000: 'rgFcLcb97', FibRgFcLcb2002: 'rgFcLcb2000',
+    FibRgFcLcb2003: 'rgFcLcb2002', FibRgFcLcb2007: 'rgFcLcb2003'}
+
+_FCLCB97_ZERO = [
+    'lcbPlcfSea', 'lcbPlcfFldMcr', 'lcbUnused1', 'lcbSttbfMcr',
+    'lcbPlcfPgdFtn', 'lcbAutosaveSource', 'lcbUnused2', 'lcbUnused3',
+    'lcbFormFldSttbs', 'lcbUnused4', 'lcbSttbfIntlFld']
+
+
+class Fib:
+    """
+    Decoded File Information Block. Sections are Record instances, so any
+    field is one attribute access away (fib.fcClx, fib.ccpText, ...).
+    Use as_dict() for the nested dict layout returned by build_fib.
+    """
+    __slots__ = ('base', 'csw', 'fibRgW', 'cslw', 'fibRgLw', 'cbRgFcLcb',
+                 'fibRgFcLcb', 'cswNew', 'fibRgCswNew', 'nFib', 'table', 'size')
+
+    @property
+    def fcClx(self):
+        return self.fibRgFcLcb[0].fcClx
+
+    @property
+    def lcbClx(self):
+        return self.fibRgFcLcb[0].lcbClx
+
+    def __getattr__(self, name):
+        # only reached for names that are not slots/properties
+        if name not in Fib.__slots__ and not name.startswith('_'):
+            for section in (self.fibRgLw, *self.fibRgFcLcb, self.base, self.fibRgW):
+                if name in section._names:
+                    return getattr(section, name)
+        raise AttributeError(name)
+
+    def as_dict(self):
+        """returns: the FIB as the nested dict produced by build_fib"""
+        output = {}
+        output['base'] = self.base.as_dict(hex=True)
+        output['csw'] = self.csw
+        output['csw_hex'] = formatted_hex(self.csw)
+        output['fibRgW'] = self.fibRgW.as_dict()
+        output['cslw'] = self.cslw
+        output['cslw_hex'] = formatted_hex(self.cslw)
+        output['fibRgLw'] = self.fibRgLw.as_dict()
+        output['cbRgFcLcb'] = self.cbRgFcLcb
+        output['cbRgFcLcb_hex'] = formatted_hex(self.cbRgFcLcb)
+        rgfclcb = None
+        for section in self.fibRgFcLcb:
+            current = section.as_dict()
+            if rgfclcb is not None:
+                current = {_FCLCB_NESTING[type(section)]: rgfclcb, **current}
+            rgfclcb = current
+        output['fibRgFcLcb'] = rgfclcb
+        output['cswNew'] = self.cswNew
+        output['cswNew_hex'] = formatted_hex(self.cswNew)
+        if self.fibRgCswNew is not None:
+            output['fibRgCswNew'] = {
+                'nFibNew': self.fibRgCswNew.nFibNew,
+                'nFibNew_hex': self.fibRgCswNew.hex('nFibNew'),
+                'rgCswNewData': self.fibRgCswNew.pack()[2:]}
+        else:
+            output['fibRgCswNew'] = {}
+        output['nFib'] = formatted_hex(self.nFib)
+        output['_table'] = self.table
+        output['_lenfib'] = self.size
+        return output
+
+
+def parse_fib(bytecode):
+    """
+    @param bytecode: WordDocument stream (or at least its leading FIB bytes)
+    returns: Fib
+    raises: UnsupportedVersion for files older than Word 97, Corrupt otherwise
+    """
+    try:
+        return _parse_fib(bytecode)
+    except struct.error as e:
+        raise Corrupt("FIB is truncated") from e
+
+
+def _parse_fib(bytecode):
+    fib = Fib()
 
     # 32 bytes
-    output['base'] = bytecode[offset:offset + 32]
-    output['base'] = build_base(output['base'])
-    offset += 32
-    
-    # 2 bytes
-    output['csw'] = int.from_bytes(bytecode[offset:offset + 2],'little', signed=False)
-    output['csw_hex'] = formatted_hex(output['csw'])
-    assert output['csw'] == 0x000E
-    offset += 2
-    
-    # x*16 bites (16/8  = 2)
-    output['fibRgW'] = bytecode[offset:offset + (output['csw']*2)]
-    output['fibRgW'] = build_fibrgw97(output['fibRgW'])
-    offset += output['csw']*2
-
-    # 2 byte integer
-    output['cslw'] = int.from_bytes(bytecode[offset:offset + 2],'little', signed=False)
-    output['cslw_hex'] = formatted_hex(output['cslw'])
-    assert output['cslw'] == 0x0016
+    base = FibBase.unpack_from(bytecode, 0)
+    if base.wIdent != 0xA5EC:
+        raise Corrupt("not a Word document (wIdent 0x%04X)" % base.wIdent)
+    if base.nFib < 0x00C1:
+        raise UnsupportedVersion("nFib 0x%04X predates Word 97" % base.nFib)
+    fib.base = _check_base(base)
+    offset = FibBase.size
+
+    # 2 bytes, then csw*2 bytes
+    fib.csw = U16.unpack_from(bytecode, offset)[0]
+    if fib.csw != 0x000E:
+        raise Corrupt("invalid csw 0x%04X" % fib.csw)
     offset += 2
+    fib.fibRgW = FibRgW97.unpack_from(bytecode, offset)
+    offset += fib.csw * 2
 
-    # cslw*32 bites (32/8  = 4)
-    output['fibRgLw'] = bytecode[offset:offset + (output['cslw']*4)]
-    output['fibRgLw'] = build_fibrglw97(output['fibRgLw'])
-    offset += output['cslw']*4
-
-    # 2 bytes
-    output['cbRgFcLcb'] = int.from_bytes(bytecode[offset:offset + 2],'little', signed=False)
-    output['cbRgFcLcb_hex'] = formatted_hex(output['cbRgFcLcb'])
+    # 2 bytes, then cslw*4 bytes
+    fib.cslw = U16.unpack_from(bytecode, offset)[0]
+    if fib.cslw != 0x0016:
+        raise Corrupt("invalid cslw 0x%04X" % fib.cslw)
     offset += 2
+    fib.fibRgLw = _check_fibrglw97(FibRgLw97.unpack_from(bytecode, offset))
+    offset += fib.cslw * 4
 
-    # cslw*64 bites (64/8  = 8)    
-    output['fibRgFcLcb'] = bytecode[offset:offset + (output['cbRgFcLcb']*8)]
-    offset += (output['cbRgFcLcb']*8)
+    # 2 bytes, then cbRgFcLcb*8 bytes decoded once nFib is known
+    fib.cbRgFcLcb = U16.unpack_from(bytecode, offset)[0]
+    offset += 2
+    fclcb_offset = offset
+    offset += fib.cbRgFcLcb * 8
 
-    # 2 bytes
-    output['cswNew'] = int.from_bytes(bytecode[offset:offset + 2],'little', signed=False)
-    output['cswNew_hex'] = formatted_hex(output['cswNew'])
-    assert output['cswNew'] in {0, 0x0002, 0x0005}
+    # 2 bytes, then cswNew*2 bytes
+    fib.cswNew = U16.unpack_from(bytecode, offset)[0]
+    if fib.cswNew not in {0, 0x0002, 0x0005}:
+        raise Corrupt("invalid cswNew 0x%04X" % fib.cswNew)
     offset += 2
-    
-    # x*16 (16/8=2)
-    if output['cswNew'] != 0:
-        output['fibRgCswNew'] = bytecode[offset:offset + (output['cswNew']*2)]
-        output['fibRgCswNew'] = build_fibrgcswnew(output['fibRgCswNew'])
-        offset += output['cswNew']*2
+    if fib.cswNew == 0x0002:
+        fib.fibRgCswNew = FibRgCswNew2000.unpack_from(bytecode, offset)
+    elif fib.cswNew == 0x0005:
+        fib.fibRgCswNew = FibRgCswNew2007.unpack_from(bytecode, offset)
     else:
-        output['fibRgCswNew'] = {}
+        fib.fibRgCswNew = None
+    offset += fib.cswNew * 2
 
     # variables
-    if output['cswNew']==0:
-        output['nFib'] = formatted_hex(output['base']['nFib'])
-    else:
-        output['nFib'] = formatted_hex(output['fibRgCswNew']['nFibNew'])
-    if output['base']['fWhichTblStm'] == 1:
-        output['_table'] = '1Table'
-    else:
-        output['_table'] = '0Table'
-    
+    fib.nFib = fib.base.nFib if fib.fibRgCswNew is None else fib.fibRgCswNew.nFibNew
+    fib.table = '1Table' if fib.base.fWhichTblStm == 1 else '0Table'
+
     # build the complex object
-    if output['nFib'] == '0x00C1':
-        output['fibRgFcLcb'] = build_fibrgfclcb97(output['fibRgFcLcb'])
-    elif output['nFib'] == '0x00D9':
-        output['fibRgFcLcb'] = build_fibrgfclcb2000(output['fibRgFcLcb'])
-    elif output['nFib'] == '0x0101':
-        output['fibRgFcLcb'] = build_fibrgfclcb2002(output['fibRgFcLcb'])
-    elif output['nFib'] == '0x010C':
-        output['fibRgFcLcb'] = build_fibrgfclcb2003(output['fibRgFcLcb'])
-    elif output['nFib'] == '0x0112':
-        output['fibRgFcLcb'] = build_fibrgfclcb2007(output['fibRgFcLcb'])
-    else:
-        assert False, "Invalid value detected for nFib. Aborting."
-    
-    output['_lenfib'] = offset
+    sections = FCLCB_SECTIONS.get(fib.nFib)
+    if sections is None:
+        raise UnsupportedVersion("unsupported nFib 0x%04X" % fib.nFib)
+    fclcb = []
+    for section in sections:
+        fclcb.append(section.unpack_from(bytecode, fclcb_offset))
+        fclcb_offset += section.size
+    _check_fibrgfclcb97(fclcb[0])
+    fib.fibRgFcLcb = tuple(fclcb)
+    fib.size = offset
+    return fib
+
+
+def story_ranges(fib):
+    """
+    @param fib: Fib
+    returns: {story name: (cp_start, cp_end)} for every story in STORIES
+    """
+    output = {}
+    cp = 0
+    for name, field in STORIES:
+        count = max(getattr(fib.fibRgLw, field), 0)
+        output[name] = (cp, cp + count)
+        cp += count
     return output
 
 
+def read_fib(stream):
+    """
+    @param stream: file-like object positioned at the start of the WordDocument stream
+    returns: Fib, reading only the bytes the FIB occupies
+    """
+    # fixed part up to and including cbRgFcLcb
+    bytecode = _read_exactly(stream, FibBase.size + 2 + 28 + 2 + 88 + 2)
+    cb_rgfclcb = U16.unpack_from(bytecode, len(bytecode) - 2)[0]
+
+    # fibRgFcLcb and cswNew, then fibRgCswNew
+    bytecode += _read_exactly(stream, cb_rgfclcb * 8 + 2)
+    csw_new = U16.unpack_from(bytecode, len(bytecode) - 2)[0]
+    bytecode += _read_exactly(stream, csw_new * 2)
+    return parse_fib(bytecode)
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise Corrupt("WordDocument stream ends inside the FIB")
+    return data
+
+
+def check_encryption(fib):
+    """raises: Encrypted if the document is encrypted or obfuscated; returns: fib"""
+    if fib.base.fEncrypted:
+        raise Encrypted("document is %s" % ('obfuscated' if fib.base.fObfuscated else 'encrypted'))
+    return fib
+
+
+def _check_base(base):
+    if base.fExtChar != 1 or base.nFibBack not in {0x00BF, 0x00C1}:
+        raise Corrupt("invalid FibBase")
+    if base.envr != 0 or base.fMac != 0 or base.reserved3 != 0 or base.reserved4 != 0:
+        raise Corrupt("invalid FibBase")
+    return base
+
+
+def _check_fibrglw97(fibrglw):
+    if fibrglw.reserved13 != 0 or fibrglw.reserved14 != 0:
+        raise Corrupt("invalid FibRgLw97")
+    return fibrglw
+
+
+def _check_fibrgfclcb97(fibrgfclcb):
+    if any(getattr(fibrgfclcb, i) != 0 for i in _FCLCB97_ZERO):
+        raise Corrupt("invalid FibRgFcLcb97")
+    return fibrgfclcb
+
+
+def build_fib(bytecode):
+    return parse_fib(bytecode).as_dict()
+
+
 def build_base(bytecode):
-    fields = {
-        'wIdent': 2, 'nFib': 2, 'unused': 2, 'lid': 2, 'pnNext': 2,
-        'bit_flags': 2,  # 16 bits covering multiple fields
-        'nFibBack': 2, 'lKey': 4, 'envr': 1, 'extra_flags': 1,
-        'reserved3': 2, 'reserved4': 2, 'reserved5': 4, 'reserved6': 4
-    }
-    
-    output = {}
-    offset = 0
-    for key, size in fields.items():
-        output[key] = int.from_bytes(bytecode[offset:offset + size], 'little')
-        output[key + '_hex'] = formatted_hex(int.from_bytes(bytecode[offset:offset + size], 'little'))
-        offset += size
-    
-    # Extract individual bit fields from 'bit_flags'
-    bit_flags = output.pop('bit_flags')
-    bit_fields = [
-        'fDot', 'fGlsy', 'fComplex', 'fHasPic',
-        'cQuickSaves', 'fEncrypted', 'fWhichTblStm', 'fReadOnlyRecommended',
-        'fWriteReservation', 'fExtChar', 'fLoadOverride', 'fFarEast', 'fObfuscated']
-    
-    for i, name in enumerate(bit_fields):
-        if name == 'cQuickSaves':
-            output[name] = (bit_flags >> i) & 0b1111  # 4 bits
-        else:
-            output[name] = (bit_flags >> i) & 1  # 1 bit
-    
-    # Extract individual bit fields from 'extra_flags'
-    extra_flags = output.pop('extra_flags')
-    extra_bit_fields = ['fMac', 'fEmptySpecial', 'fLoadOverridePage', 'reserved1', 'reserved2', 'fSpare0']
-    for i, name in enumerate(extra_bit_fields):
-        output[name] = (extra_flags >> i) & 1
-        
-    # assertions
-    assert output['fExtChar'] == 1
-    assert output['nFibBack'] in {0x00BF, 0x00C1}
-    assert output['envr'] == 0
-    assert output['fMac'] == 0
-    assert output['reserved3'] == 0
-    assert output['reserved4'] == 0
-    return output
+    return _check_base(FibBase.unpack_from(bytecode)).as_dict(hex=True)
 
 
 def build_fibrgw97(bytecode):
-    fields = {
-        'reserved1': 2, 'reserved2': 2, 'reserved3': 2, 'reserved4': 2,
-        'reserved5': 2, 'reserved6': 2, 'reserved7': 2, 'reserved8': 2,
-        'reserved9': 2, 'reserved10': 2, 'reserved11': 2, 'reserved12': 2,
-        'reserved13': 2, 'lidFE': 2
-    }
-    output = {}
-    offset = 0
-    for key, size in fields.items():
-        output[key] = int.from_bytes(bytecode[offset:offset + size], 'little')
-        offset += size
-    return output
+    return FibRgW97.unpack_from(bytecode).as_dict()
 
 
 def build_fibrglw97(bytecode):
-    fields = {
-        'cbMac': 4, 'reserved1': 4, 'reserved2': 4, 'ccpText': 4,
-        'ccpFtn': 4, 'ccpHdd': 4, 'reserved3': 4, 'ccpAtn': 4,
-        'ccpEdn': 4, 'ccpTxbx': 4, 'ccpHdrTxbx': 4, 'reserved4': 4,
-        'reserved5': 4, 'reserved6': 4, 'reserved7': 4, 'reserved8': 4,
-        'reserved9': 4, 'reserved10': 4, 'reserved11': 4, 'reserved12': 4,
-        'reserved13': 4, 'reserved14': 4}
-    output = {}
-    offset = 0
-    for key, size in fields.items():
-        output[key] = int.from_bytes(bytecode[offset:offset + size], 'little', signed=True)
-        offset += size
-    assert output['reserved13'] == output['reserved14'] == 0
-    return output
-
-def build_fibrgfclcb97(bytecode):
+    return _check_fibrglw97(FibRgLw97.unpack_from(bytecode)).as_dict()
 
-    output = {}
-    fields = [
-        "fcStshfOrig", "lcbStshfOrig", "fcStshf", "lcbStshf", "fcPlcffndRef", "lcbPlcffndRef",
-        "fcPlcffndTxt", "lcbPlcffndTxt", "fcPlcfandRef", "lcbPlcfandRef", "fcPlcfandTxt", "lcbPlcfandTxt",
-        "fcPlcfSed", "lcbPlcfSed", "fcPlcPad", "lcbPlcPad", "fcPlcfPhe", "lcbPlcfPhe", "fcSttbfGlsy", "lcbSttbfGlsy",
-        "fcPlcfGlsy", "lcbPlcfGlsy", "fcPlcfHdd", "lcbPlcfHdd", "fcPlcfBteChpx", "lcbPlcfBteChpx", "fcPlcfBtePapx",
-        "lcbPlcfBtePapx", "fcPlcfSea", "lcbPlcfSea", "fcSttbfFfn", "lcbSttbfFfn", "fcPlcfFldMom", "lcbPlcfFldMom",
-        "fcPlcfFldHdr", "lcbPlcfFldHdr", "fcPlcfFldFtn", "lcbPlcfFldFtn", "fcPlcfFldAtn", "lcbPlcfFldAtn", 
-        "fcPlcfFldMcr", "lcbPlcfFldMcr", "fcSttbfBkmk", "lcbSttbfBkmk", "fcPlcfBkf", "lcbPlcfBkf", "fcPlcfBkl",
-        "lcbPlcfBkl", "fcCmds", "lcbCmds", "fcUnused1", "lcbUnused1", "fcSttbfMcr", "lcbSttbfMcr", "fcPrDrvr", 
-        "lcbPrDrvr", "fcPrEnvPort", "lcbPrEnvPort", "fcPrEnvLand", "lcbPrEnvLand", "fcWss", "lcbWss", "fcDop", 
-        "lcbDop", "fcSttbfAssoc", "lcbSttbfAssoc", "fcClx", "lcbClx", "fcPlcfPgdFtn", "lcbPlcfPgdFtn", 
-        "fcAutosaveSource", "lcbAutosaveSource", "fcGrpXstAtnOwners", "lcbGrpXstAtnOwners", "fcSttbfAtnBkmk", 
-        "lcbSttbfAtnBkmk", "fcUnused2", "lcbUnused2", "fcUnused3", "lcbUnused3", "fcPlcSpaMom", "lcbPlcSpaMom", 
-        "fcPlcSpaHdr", "lcbPlcSpaHdr", "fcPlcfAtnBkf", "lcbPlcfAtnBkf", "fcPlcfAtnBkl", "lcbPlcfAtnBkl", "fcPms", 
-        "lcbPms", "fcFormFldSttbs", "lcbFormFldSttbs", "fcPlcfendRef", "lcbPlcfendRef", "fcPlcfendTxt", 
-        "lcbPlcfendTxt", "fcPlcfFldEdn", "lcbPlcfFldEdn", "fcUnused4", "lcbUnused4", "fcDggInfo", "lcbDggInfo", 
-        "fcSttbfRMark", "lcbSttbfRMark", "fcSttbfCaption", "lcbSttbfCaption", "fcSttbfAutoCaption", 
-        "lcbSttbfAutoCaption", "fcPlcfWkb", "lcbPlcfWkb", "fcPlcfSpl", "lcbPlcfSpl", "fcPlcftxbxTxt", 
-        "lcbPlcftxbxTxt", "fcPlcfFldTxbx", "lcbPlcfFldTxbx", "fcPlcfHdrtxbxTxt", "lcbPlcfHdrtxbxTxt", 
-        "fcPlcffldHdrTxbx", "lcbPlcffldHdrTxbx", "fcStwUser", "lcbStwUser", "fcSttbTtmbd", "lcbSttbTtmbd", 
-        "fcCookieData", "lcbCookieData", "fcPgdMotherOldOld", "lcbPgdMotherOldOld", "fcBkdMotherOldOld", 
-        "lcbBkdMotherOldOld", "fcPgdFtnOldOld", "lcbPgdFtnOldOld", "fcBkdFtnOldOld", "lcbBkdFtnOldOld", 
-        "fcPgdEdnOldOld", "lcbPgdEdnOldOld", "fcBkdEdnOldOld", "lcbBkdEdnOldOld", "fcSttbfIntlFld", "lcbSttbfIntlFld",
-        "fcRouteSlip", "lcbRouteSlip", "fcSttbSavedBy", "lcbSttbSavedBy", "fcSttbFnm", "lcbSttbFnm", "fcPlfLst", 
-        "lcbPlfLst", "fcPlfLfo", "lcbPlfLfo", "fcPlcfTxbxBkd", "lcbPlcfTxbxBkd", "fcPlcfTxbxHdrBkd", 
-        "lcbPlcfTxbxHdrBkd", "fcDocUndoWord9", "lcbDocUndoWord9", "fcRgbUse", "lcbRgbUse", "fcUsp", "lcbUsp", 
-        "fcUskf", "lcbUskf", "fcPlcupcRgbUse", "lcbPlcupcRgbUse", "fcPlcupcUsp", "lcbPlcupcUsp", "fcSttbGlsyStyle", 
-        "lcbSttbGlsyStyle", "fcPlgosl", "lcbPlgosl", "fcPlcocx", "lcbPlcocx", "fcPlcfBteLvc", "lcbPlcfBteLvc", 
-        "dwLowDateTime", "dwHighDateTime", "fcPlcfLvcPre10", "lcbPlcfLvcPre10", "fcPlcfAsumy", "lcbPlcfAsumy", 
-        "fcPlcfGram", "lcbPlcfGram", "fcSttbListNames", "lcbSttbListNames", "fcSttbfUssr", "lcbSttbfUssr"
-    ]
-    offset = 0
-    for key in fields:
-        output[key] = int.from_bytes(bytecode[offset:offset + 4], 'little')
-        offset += 4
-    assert all([output[i]==0 for i in [
-        'lcbPlcfSea','lcbPlcfFldMcr','lcbUnused1','lcbSttbfMcr',
-        'lcbPlcfPgdFtn','lcbAutosaveSource','lcbUnused2','lcbUnused3',
-        'lcbFormFldSttbs','lcbUnused4','lcbSttbfIntlFld']])
-    return output
 
+def build_fibrgfclcb97(bytecode):
+    return _check_fibrgfclcb97(FibRgFcLcb97.unpack_from(bytecode)).as_dict()
 
 
 def build_fibrgfclcb2000(bytecode):
-    
-    output = {}
-    offset = 0
-    output['rgFcLcb97'] = build_fibrgfclcb97(bytecode[0:744])
-    offset += 744
-
-    # remaining sections
-    fields = ['fcPlcfTch', 'lcbPlcfTch', 'fcRmdThreading', 'lcbRmdThreading',
-              'fcMid', 'lcbMid', 'fcSttbRgtplc', 'lcbSttbRgtplc',
-              'fcMsoEnvelope', 'lcbMsoEnvelope', 'fcPlcfLad', 'lcbPlcfLad',
-              'fcRgDofr', 'lcbRgDofrfcPlcosl', 'lcbPlcosl', 'fcPlcfCookieOld',
-              'lcbPlcfCookieOld', 'fcPgdMotherOld', 'lcbPgdMotherOld',
-              'fcBkdMotherOld', 'lcbBkdMotherOld', 'fcPgdFtnOld',
-              'lcbPgdFtnOld', 'fcBkdFtnOld', 'lcbBkdFtnOld', 'fcPgdEdnOld',
-              'lcbPgdEdnOld', 'fcBkdEdnOld', 'lcbBkdEdnOld']
-    for key in fields:
-        output[key] = int.from_bytes(bytecode[offset:offset + 4], 'little')
-        offset += 4
-    return output
+    return {'rgFcLcb97': build_fibrgfclcb97(bytecode),
+            **FibRgFcLcb2000.unpack_from(bytecode, 744).as_dict()}
 
 
 def build_fibrgfclcb2002(bytecode):
-    
-    
-    output = {}
-    offset = 0
-    output['rgFcLcb2000'] = build_fibrgfclcb2000(bytecode[0:864])
-    offset += 864
-    fields = [
-        'fcUnused1', 'lcbUnused1', 'fcPlcfPgp', 'lcbPlcfPgp','fcPlcfuim',
-        'lcbPlcfuim', 'fcPlfguidUim', 'lcbPlfguidUim', 'fcAtrdExtra',
-        'lcbAtrdExtra', 'fcPlrsid', 'lcbPlrsid', 'fcSttbfBkmkFactoid',
-        'lcbSttbfBkmkFactoid', 'fcPlcfBkfFactoid', 'lcbPlcfBkfFactoid',
-        'fcPlcfcookie', 'lcbPlcfcookie', 'fcPlcfBklFactoid',
-        'lcbPlcfBklFactoid', 'fcFactoidData', 'lcbFactoidData', 'fcDocUndo',
-        'lcbDocUndo', 'fcSttbfBkmkFcc', 'lcbSttbfBkmkFcc', 'fcPlcfBkfFcc',
-        'lcbPlcfBkfFcc', 'fcPlcfBklFcc', 'lcbPlcfBklFcc',
-        'fcSttbfbkmkBPRepairs', 'lcbSttbfbkmkBPRepairs', 'fcPlcfbkfBPRepairs',
-        'lcbPlcfbkfBPRepairs', 'fcPlcfbklBPRepairs', 'lcbPlcfbklBPRepairs',
-        'fcPmsNew', 'lcbPmsNew', 'fcODSO', 'lcbODSO', 'fcPlcfpmiOldXP',
-        'lcbPlcfpmiOldXP', 'fcPlcfpmiNewXP', 'lcbPlcfpmiNewXP',
-        'fcPlcfpmiMixedXP', 'lcbPlcfpmiMixedXP', 'fcUnused2', 'lcbUnused2',
-        'fcPlcffactoid', 'lcbPlcffactoid', 'fcPlcflvcOldXP', 'lcbPlcflvcOldXP',
-        'fcPlcflvcNewXP', 'lcbPlcflvcNewXP', 'fcPlcflvcMixedXP',
-        'lcbPlcflvcMixedXP']
-    for key in fields:
-        output[key] = int.from_bytes(bytecode[offset:offset + 4], 'little')
-        offset += 4
-    return output
+    return {'rgFcLcb2000': build_fibrgfclcb2000(bytecode),
+            **FibRgFcLcb2002.unpack_from(bytecode, 864).as_dict()}
 
 
 def build_fibrgfclcb2003(bytecode):
-    
-    output = {}
-    offset = 0
-    output['rgFcLcb2002'] = build_fibrgfclcb2002(bytecode[0:1088])
-    offset += 1088
-    
-    # remaining sections
-    fields = ['fcHplxsdr', 'lcbHplxsdr', 'fcSttbfBkmkSdt', 'lcbSttbfBkmkSdt',
-              'fcPlcfBkfSdt', 'lcbPlcfBkfSdt', 'fcPlcfBklSdt', 'lcbPlcfBklSdt',
-              'fcCustomXForm', 'lcbCustomXForm', 'fcSttbfBkmkProt',
-              'lcbSttbfBkmkProt', 'fcPlcfBkfProt', 'lcbPlcfBkfProt',
-              'fcPlcfBklProt', 'lcbPlcfBklProt', 'fcSttbProtUser',
-              'lcbSttbProtUser', 'fcUnused', 'lcbUnused', 'fcPlcfpmiOld',
-              'lcbPlcfpmiOld', 'fcPlcfpmiOldInline', 'lcbPlcfpmiOldInline',
-              'fcPlcfpmiNew', 'lcbPlcfpmiNew', 'fcPlcfpmiNewInline',
-              'lcbPlcfpmiNewInline', 'fcPlcflvcOld', 'lcbPlcflvcOld',
-              'fcPlcflvcOldInline', 'lcbPlcflvcOldInline', 'fcPlcflvcNew',
-              'lcbPlcflvcNew', 'fcPlcflvcNewInline', 'lcbPlcflvcNewInline',
-              'fcPgdMother', 'lcbPgdMother', 'fcBkdMother', 'lcbBkdMother',
-              'fcAfdMother', 'lcbAfdMother', 'fcPgdFtn', 'lcbPgdFtn',
-              'fcBkdFtn', 'lcbBkdFtn', 'fcAfdFtn', 'lcbAfdFtn', 'fcPgdEdn',
-              'lcbPgdEdn', 'fcBkdEdn', 'lcbBkdEdn', 'fcAfdEdn', 'lcbAfdEdn',
-              'fcAfd', 'lcbAfd']
-    for key in fields:
-        output[key] = int.from_bytes(bytecode[offset:offset + 4], 'little')
-        offset += 4
-    return output
+    return {'rgFcLcb2002': build_fibrgfclcb2002(bytecode),
+            **FibRgFcLcb2003.unpack_from(bytecode, 1088).as_dict()}
 
 
 def build_fibrgfclcb2007(bytecode):
-    
-    output = {}
-    offset = 0
-    output['rgFcLcb2003'] = build_fibrgfclcb2003(bytecode[0:1312])
-    offset += 1312
-    
-    # remaining sections
-    fields = ['fcPlcfmthd', 'lcbPlcfmthd', 'fcSttbfBkmkMoveFrom',
-              'lcbSttbfBkmkMoveFrom', 'fcPlcfBkfMoveFrom',
-              'lcbPlcfBkfMoveFrom', 'fcPlcfBklMoveFrom', 'lcbPlcfBklMoveFrom',
-              'fcSttbfBkmkMoveTo', 'lcbSttbfBkmkMoveTo', 'fcPlcfBkfMoveTo',
-              'lcbPlcfBkfMoveTo', 'fcPlcfBklMoveTo', 'lcbPlcfBklMoveTo',
-              'fcUnused1', 'lcbUnused1', 'fcUnused2', 'lcbUnused2',
-              'fcUnused3', 'lcbUnused3', 'fcSttbfBkmkArto', 'lcbSttbfBkmkArto',
-              'fcPlcfBkfArto', 'lcbPlcfBkfArto', 'fcPlcfBklArto',
-              'lcbPlcfBklArto', 'fcArtoData', 'lcbArtoData', 'fcUnused4',
-              'lcbUnused4', 'fcUnused5', 'lcbUnused5', 'fcUnused6',
-              'lcbUnused6', 'fcOssTheme', 'lcbOssTheme',
-              'fcColorSchemeMapping', 'lcbColorSchemeMapping']
-    for key in fields:
-        output[key] = int.from_bytes(bytecode[offset:offset + 4], 'little')
-        offset += 4
-    return output
+    return {'rgFcLcb2003': build_fibrgfclcb2003(bytecode),
+            **FibRgFcLcb2007.unpack_from(bytecode, 1312).as_dict()}
 
 
-def build_clx(bytecode):
+def _split_clx(bytecode, keep_prcs: bool = True):
+    """
+    Splits a Clx into its RgPrc entries and the Pcdt bytes that follow them.
+    Each Prc is clxt (0x01), a 2-byte cbGrpprl and cbGrpprl bytes of GrpPrl,
+    so the Pcdt is reached in one pass by skipping over the length prefixes.
+    @param keep_prcs: collect the GrpPrl of each Prc; otherwise only skip them
+    returns: (list of GrpPrl slices, Pcdt slice)
+    """
+    prcs = []
+    idx = 0
+    end = len(bytecode)
+    while idx < end and bytecode[idx] == 0x01:
+        if idx + 3 > end:
+            raise Corrupt("Prc is truncated")
+        cb_grpprl = I16.unpack_from(bytecode, idx + 1)[0]
+        if not 0 <= cb_grpprl <= 0x3FA2:
+            raise Corrupt("invalid cbGrpprl %d" % cb_grpprl)
+        if keep_prcs:
+            prcs.append(bytecode[idx + 3:idx + 3 + cb_grpprl])
+        idx += 3 + cb_grpprl
+    if idx >= end or bytecode[idx] != 0x02:
+        raise Corrupt("Clx has no Pcdt")
+    return prcs, bytecode[idx:]
 
-    # First byte of Clx determines whether there's a Prc array or not 
+
+def build_clx(bytecode):
     clx = {}
-    if bytecode[0] == 0x02:
-        # This means the Prc array is empty, and the first byte of the Clx structure
-        # is 0x02 to signal this. The Pcdt follows directly.
-        clx['RgPrc'] = []
-        clx['Pcdt'] = bytecode
-    else:
-        # If the first byte is not 0x02, it indicates there are Prc elements
-        prcs = []
-        idx = 0
-        # Parse RgPrc (array of Prc)
-        while bytecode[idx] != 0x02:  # We assume that 0x02 indicates the start of Pcdt
-            prcs.append(bytecode[idx])  # This is simplified; actual parsing of Prc should be here
-        # After Prcs, we parse the Pcdt
-        clx['RgPrc'] = prcs
-        clx['Pcdt'] = bytecode[idx:]  # Rest of the bytecode is the Pcdt
+    clx['RgPrc'], clx['Pcdt'] = _split_clx(bytecode)
     clx['Pcdt'] = build_pcdt(clx['Pcdt'])
     return clx
 
@@ -343,7 +446,8 @@ def build_pcdt(bytecode):
 
     # 1 byte starting
     output['clxt'] = int.from_bytes(bytecode[offset:offset + 1], 'little')
-    assert output['clxt'] == 0x02, "invalid starting byte. Aborting."
+    if output['clxt'] != 0x02:
+        raise Corrupt("invalid Pcdt clxt")
     offset += 1
 
     # 4 byte
@@ -394,7 +498,8 @@ def build_pcd(bytecode):
     Parses the full Pcd structure from the given bytecode.
     b'\x00\x00\x00\x00\x00\x88\x0b\x00'
     """
-    assert len(bytecode) == 8, 'invalid bytecode length'
+    if len(bytecode) != 8:
+        raise Corrupt("Pcd is %d bytes, expected 8" % len(bytecode))
     output = {
         'fNoParaLast': (bytecode[0] +  (bytecode[1] << 8)) & 0x01,
         'fR1': (bytecode[0] + (bytecode[1] << 8) >> 1) & 0x01,
@@ -416,51 +521,144 @@ def build_pcd(bytecode):
     return output
 
 
+class PieceTable:
+    """
+    PlcPcd decoded in bulk into parallel arrays:
+    cp (n+1 character positions), fc (30-bit offsets), compressed (fCompressed
+    flags) and prm (raw 16-bit Prm values). Piece i covers cp[i]..cp[i+1].
+    """
+    __slots__ = ('cp', 'fc', 'compressed', 'prm')
+
+    def __len__(self):
+        return len(self.fc)
+
+    def byte_range(self, i: int):
+        """returns: (start, end) byte offsets of piece i in the WordDocument stream"""
+        count = self.cp[i + 1] - self.cp[i]
+        if self.compressed[i]:
+            start = self.fc[i] >> 1
+            return start, start + count
+        return self.fc[i], self.fc[i] + 2 * count
+
+    def prm_of(self, i: int, rgprc=None):
+        """returns: build_prm of piece i, resolving Prm1 against rgprc if given"""
+        return build_prm(self.prm[i], rgprc)
+
+    def iter_ranges(self):
+        """yields: (cp_start, cp_end, byte_start, byte_end, compressed) per piece"""
+        cp = self.cp
+        for cp_start, cp_end, fc, compressed in zip(cp, cp[1:], self.fc, self.compressed):
+            if compressed:
+                start = fc >> 1
+                yield cp_start, cp_end, start, start + (cp_end - cp_start), 1
+            else:
+                yield cp_start, cp_end, fc, fc + 2 * (cp_end - cp_start), 0
+
+
+def parse_clx(bytecode, limits=None):
+    """
+    @param bytecode: Clx bytes from the table stream
+    @param limits: optional limits.Limits checked before the piece arrays are built
+    returns: PieceTable of the Clx's Pcdt
+    """
+    _, pcdt = _split_clx(bytecode, keep_prcs=False)
+    return parse_pcdt(pcdt, limits)
 
 
-# def build_prm(bytecode: bytes):
-#     """
-#     Parses a 16-bit (2-byte) Prm structure and determines whether it is Prm0 or Prm1.
-#     """
-#     if len(bytecode) < 2:
-#         raise ValueError("Bytecode must be exactly 2 bytes long")
+def parse_rgprc(bytecode):
+    """
+    @param bytecode: Clx bytes from the table stream
+    returns: list of GrpPrl slices, indexed by Prm1.igrpprl
+    """
+    return _split_clx(bytecode)[0]
 
-#     # Convert the 2-byte sequence to a 16-bit integer (little-endian)
-#     prm_raw = int.from_bytes(bytecode, byteorder='little')
-#     fComplex = (prm_raw >> 15) & 1  # Extract the highest bit (bit 15)
-#     data = prm_raw & 0x7FFF  # Mask the lower 15 bits (0x7FFF = 0111 1111 1111 1111)
 
-#     output = {
-#         "fComplex": fComplex,
-#         "data": data.to_bytes((data.bit_length() + 7) // 8, byteorder='little'),
-#     }
-    
-#     structure_type = "Prm1" if fComplex else "Prm0"
-#     if structure_type == "Prm1":
-#         pass
-#         # !!! 
-#     elif structure_type == "Prm0":
-#         pass
-#         # !!! b'\x00\x10' is an example
-#     else:
-#         assert False
-#     return output
+def parse_pcdt(bytecode, limits=None):
+    if len(bytecode) < 5 or bytecode[0] != 0x02:
+        raise Corrupt("invalid Pcdt")
+    size = U32.unpack_from(bytecode, 1)[0]
+    if 5 + size > len(bytecode):
+        raise Corrupt("PlcPcd of %d bytes runs past the Clx" % size)
+    return parse_plcpcd(bytecode[5:5 + size], limits)
 
 
-def build_fibrgcswnew(bytecode):
+def parse_plcpcd(bytecode, limits=None):
+    """
+    Parses a PlcPcd into a PieceTable without a per-field Python loop.
+    """
+    if len(bytecode) < 4 or (len(bytecode) - 4) % 12:
+        raise Corrupt("PlcPcd of %d bytes is not 4 + 12n" % len(bytecode))
+    num_pcds = (len(bytecode) - 4) // 12
+    if limits is not None:
+        limits.check_pieces(num_pcds)
+    cp_size = 4 * (num_pcds + 1)
+
+    # CPs are contiguous 32-bit values; each Pcd is 4 little-endian 16-bit words:
+    # flags, fc low, fc high (with fCompressed in bit 14), prm
+    cp = array('I')
+    cp.frombytes(bytecode[:cp_size])
+    words = array('H')
+    words.frombytes(bytecode[cp_size:cp_size + 8 * num_pcds])
+    if sys.byteorder == 'big':
+        cp.byteswap()
+        words.byteswap()
+
+    high = words[2::4]
+    table = PieceTable()
+    table.cp = cp
+    table.fc = array('I', [low | ((hi & 0x3FFF) << 16) for low, hi in zip(words[1::4], high)])
+    table.compressed = bytes([(hi >> 14) & 1 for hi in high])
+    table.prm = words[3::4]
+    return table
+
+
+def check_piece_table(pieces, stream_size: int):
+    """
+    raises: Corrupt unless the aCP values ascend and every piece lies inside
+            the WordDocument stream
+    returns: pieces
+    """
+    cp = pieces.cp
+    if any(a > b for a, b in zip(cp, cp[1:])):
+        raise Corrupt("aCP is not ascending")
+    for cp_start, _, _, byte_end, _ in pieces.iter_ranges():
+        if byte_end > stream_size:
+            raise Corrupt("piece at CP %d ends at byte %d, past the %d-byte stream"
+                          % (cp_start, byte_end, stream_size))
+    return pieces
+
+
+
+
+def build_prm(bytecode, rgprc=None):
+    """
+    Parses a 16-bit Prm. Bit 0 (fComplex) selects the layout:
+    Prm0 holds a single property (isprm in bits 1-7, val in bits 8-15);
+    Prm1 holds igrpprl (bits 1-15), an index into the Clx's RgPrc.
+    @param bytecode: the 2 Prm bytes, or the value from PieceTable.prm
+    @param rgprc: optional result of parse_rgprc, to resolve Prm1 to its GrpPrl
+    """
+    prm = bytecode if isinstance(bytecode, int) else int.from_bytes(bytecode[:2], 'little')
+    output = {'fComplex': prm & 0x01}
+    if output['fComplex'] == 0:
+        output['isprm'] = (prm >> 1) & 0x7F
+        output['val'] = prm >> 8
+    else:
+        output['igrpprl'] = prm >> 1
+        if rgprc is not None:
+            output['GrpPrl'] = rgprc[output['igrpprl']]
+    return output
 
-    output = {}
-    offset = 0
-    output['nFibNew'] = int.from_bytes(bytecode[offset:offset + 2],'little', signed=False)
-    output['nFibNew_hex'] = formatted_hex(output['nFibNew'])
-    offset += 2
+
+def build_fibrgcswnew(bytecode):
+    nfibnew = U16.unpack_from(bytecode)[0]
+    output = {'nFibNew': nfibnew, 'nFibNew_hex': formatted_hex(nfibnew)}
 
     # fibRgCswNewData2000 (2 bytes)
-    if output['nFibNew_hex'] in {'0x00D9','0x0101','0x010C'}:
-        output['rgCswNewData'] = bytecode[offset:offset + 2]
-        
+    if nfibnew in {0x00D9, 0x0101, 0x010C}:
+        output['rgCswNewData'] = bytes(bytecode[2:4])
+
     # fibRgCswNewData2007 (8 bytes)
-    elif output['nFibNew_hex'] in {'0x0112'}:
-        output['rgCswNewData'] = bytecode[offset:offset + 8]
+    elif nfibnew in {0x0112}:
+        output['rgCswNewData'] = bytes(bytecode[2:10])
     return output
-    
\ No newline at end of file
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import doctotext
+
+
+class Cache:
+    """
+    Extraction cache keyed by document content (or by path, size and mtime with
+    key='stat'), with an in-process LRU in front of an optional sqlite store.
+    Keys include doctotext.__version__, so entries written by an older version
+    are never returned. Hits are served without opening the OLE container.
+    """
+
+    def __init__(self, path: str = None, key: str = 'content', memory_bytes: int = 64 << 20,
+                 disk_bytes: int = 1 << 30):
+        """
+        @param path: sqlite file for the on-disk store, or None for memory only
+        @param key: 'content' (hash of the bytes) or 'stat' (path, size, mtime; paths only)
+        @param memory_bytes: approximate budget of the in-process LRU
+        @param disk_bytes: budget of the on-disk store
+        """
+        if key not in {'content', 'stat'}:
+            raise ValueError("key must be 'content' or 'stat'")
+        self.key = key
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = self.misses = self.memory_hits = self.disk_hits = self.evictions = 0
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(os.path.expanduser(path), check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS entries ('
+                             'key TEXT PRIMARY KEY, spans BLOB, size INTEGER, used REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+            self._db.commit()
+            self._disk_size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def extract_text(self, source):
+        """
+        @param source: anything doctotext.extract_text accepts
+        returns: list of text spans in document, from the cache when possible
+        """
+        key, source = self._key(source)
+        spans = self.get(key)
+        if spans is None:
+            spans = doctotext.extract_text(source)
+            self.put(key, spans)
+        return spans
+
+    def get(self, key: str):
+        with self._lock:
+            spans = self._memory.get(key)
+            if spans is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                # entries are kept as tuples; callers get a list of their own
+                return list(spans)
+            if self._db is not None:
+                row = self._db.execute('SELECT spans FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._db.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+                    self._db.commit()
+                    spans = json.loads(row[0])
+                    self._remember(key, spans)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return spans
+            self.misses += 1
+            return None
+
+    def put(self, key: str, spans):
+        with self._lock:
+            self._remember(key, spans)
+            if self._db is not None:
+                blob = json.dumps(spans, ensure_ascii=False).encode('utf-8')
+                old = self._db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+                self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                 (key, blob, len(blob), time.time()))
+                self._disk_size += len(blob) - (old[0] if old else 0)
+                self._evict_disk()
+                self._db.commit()
+
+    def stats(self):
+        """returns: counters as a dict"""
+        return {'hits': self.hits, 'misses': self.misses, 'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits, 'evictions': self.evictions,
+                'memory_entries': len(self._memory), 'memory_bytes': self._memory_size}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remember(self, key, spans):
+        size = sum(len(span) for span in spans) * 2 + 64
+        if key in self._memory:
+            return
+        self._memory[key] = tuple(spans)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= sum(len(span) for span in evicted) * 2 + 64
+            self.evictions += 1
+
+    def _evict_disk(self):
+        # drop least recently used rows until the store fits its budget again
+        while self._disk_size > self.disk_bytes:
+            rows = self._db.execute('SELECT key, size FROM entries ORDER BY used LIMIT 64').fetchall()
+            if len(rows) <= 1:
+                break
+            for key, size in rows:
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._disk_size -= size
+                self.evictions += 1
+                if self._disk_size <= self.disk_bytes:
+                    break
+
+    def _key(self, source):
+        """returns: (cache key, source to extract from on a miss)"""
+        if isinstance(source, (str, os.PathLike)):
+            if self.key == 'stat':
+                path = os.path.abspath(os.fspath(source))
+                st = os.stat(path)
+                return '%s:stat:%s:%d:%d' % (doctotext.__version__, path, st.st_size, st.st_mtime_ns), source
+            digest = hashlib.blake2b(digest_size=20)
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        elif hasattr(source, 'read'):
+            # file objects are consumed once and parsed from the bytes read
+            source = source.read()
+            digest = hashlib.blake2b(source, digest_size=20)
+        else:
+            digest = hashlib.blake2b(source, digest_size=20)
+        return '%s:blake2b:%s' % (doctotext.__version__, digest.hexdigest()), source
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+import io
+import mmap
+import os
+import struct
+import sys
+from array import array
+import olefile
+from doctotext.errors import Corrupt
+
+# Compound File Binary format [MS-CFB]
+MAGIC = b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1'
+MAXREGSECT = 0xFFFFFFFA
+NOSTREAM = 0xFFFFFFFF
+STORAGE, STREAM, ROOT = 1, 2, 5
+
+# magic, sector shift, mini sector shift, directory sectors, FAT sectors, first directory
+# sector, mini stream cutoff, first MiniFAT sector, MiniFAT sectors, first DIFAT sector,
+# DIFAT sectors, then the 109 DIFAT entries held in the header
+_HEADER = struct.Struct('<8s22xHH6xIII4xIIIII109I')
+
+# name, name length, type, color, left, right, child, clsid, state, times, start sector, size
+_ENTRY = struct.Struct('<64sHBBIII16sI16xIQ')
+
+
+class Stream(io.RawIOBase):
+    """
+    Read-only view of one stream. Only the sectors covering each read are
+    fetched, and runs of consecutive sectors are fetched with a single read.
+    """
+
+    def __init__(self, read_at, chain, sector_size: int, base: int, size: int):
+        """
+        @param read_at: read_at(offset, size) of the container (or of the mini stream)
+        @param chain: sector numbers of the stream, in order
+        @param base: offset of sector 0 (one sector for the file, 0 in the mini stream)
+        """
+        self._read_at = read_at
+        self._chain = chain
+        self._sector_size = sector_size
+        self._base = base
+        self.size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size: int = -1):
+        end = self.size if size is None or size < 0 else self._pos + size
+        data = self.read_at(self._pos, end - self._pos)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read_at(self, offset: int, size: int):
+        """returns: up to size bytes from offset, without moving the position"""
+        end = min(offset + size, self.size)
+        if offset >= end:
+            return b''
+        sector_size, chain, base = self._sector_size, self._chain, self._base
+        first, last = offset // sector_size, (end - 1) // sector_size
+        parts = []
+        i = first
+        while i <= last:
+            # extend the run while the next sector follows on disk
+            j = i
+            while j < last and chain[j + 1] == chain[j] + 1:
+                j += 1
+            start = base + chain[i] * sector_size + (offset - i * sector_size if i == first else 0)
+            stop = base + chain[j] * sector_size + (end - j * sector_size if j == last else sector_size)
+            data = self._read_at(start, stop - start)
+            if len(data) != stop - start:
+                raise Corrupt("stream data runs past the end of the file")
+            parts.append(data)
+            i = j + 1
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+class CompoundFile:
+    """
+    Lightweight compound file reader with the subset of the olefile.OleFileIO
+    interface doctotext uses (exists, get_size, openstream, get_metadata, close).
+    The header, FAT, MiniFAT and directory are parsed once on open; stream
+    data is only read as it is asked for.
+    """
+
+    def __init__(self, source):
+        """
+        @param source: path, bytes-like object, mmap.mmap or binary file object
+        raises: Corrupt if source is not a compound file this reader handles
+        """
+        self._file = self._view = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb', buffering=0)
+            self._read_at = self._read_file
+            self._length = os.fstat(self._file.fileno()).st_size
+        elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            base = memoryview(source)
+            self._view = (base, base.cast('B'))
+            self._read_at = self._read_view
+            self._length = len(self._view[1])
+        elif hasattr(source, 'read') and hasattr(source, 'seek'):
+            self._stream = source
+            self._read_at = self._read_stream
+            self._length = source.seek(0, os.SEEK_END)
+        else:
+            raise TypeError("unsupported source type: %s" % type(source).__name__)
+        try:
+            self._load()
+        except struct.error as e:
+            self.close()
+            raise Corrupt("truncated compound file") from e
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_file(self, offset, size):
+        if hasattr(os, 'pread'):
+            return os.pread(self._file.fileno(), size, offset)
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def _read_view(self, offset, size):
+        return bytes(self._view[1][offset:offset + size])
+
+    def _read_stream(self, offset, size):
+        self._stream.seek(offset)
+        return self._stream.read(size)
+
+    def _load(self):
+        header = self._read_at(0, 512)
+        fields = _HEADER.unpack_from(header, 0)
+        (magic, shift, mini_shift, _, fat_count, dir_sector, self._cutoff,
+         minifat_sector, _, difat_sector, difat_count) = fields[:11]
+        if magic != MAGIC:
+            raise Corrupt("not a compound file")
+        if shift not in (9, 12) or mini_shift != 6:
+            raise Corrupt("unsupported sector size 2^%d / 2^%d" % (shift, mini_shift))
+        self._sector_size = sector_size = 1 << shift
+        max_sectors = self._length // sector_size + 1
+
+        # the FAT and DIFAT are stored in the file, so neither can have more sectors than it
+        if fat_count > max_sectors or difat_count > max_sectors:
+            raise Corrupt("header claims %d FAT and %d DIFAT sectors in a file of %d"
+                          % (fat_count, difat_count, max_sectors))
+
+        # DIFAT: header entries, then chained DIFAT sectors ending in a next pointer
+        fat_sectors = list(fields[11:11 + min(fat_count, 109)])
+        sector = difat_sector
+        visited = set()
+        for _ in range(difat_count):
+            if sector >= MAXREGSECT or len(fat_sectors) >= fat_count:
+                break
+            if sector in visited:
+                raise Corrupt("DIFAT chain loops back to sector %d" % sector)
+            visited.add(sector)
+            entries = self._unpack(self._read_at((sector + 1) << shift, sector_size))
+            fat_sectors.extend(entries[:-1])
+            sector = entries[-1]
+        if len(fat_sectors) < fat_count:
+            raise Corrupt("DIFAT lists %d of %d FAT sectors" % (len(fat_sectors), fat_count))
+
+        # FAT, read in runs of consecutive sectors
+        fat_sectors = fat_sectors[:fat_count]
+        self._fat = self._unpack(Stream(self._read_at, fat_sectors, sector_size, sector_size,
+                                        fat_count * sector_size).read())
+
+        # directory: a flat table of entries linked into red-black trees per storage
+        directory = self._regular_stream(dir_sector, None).read()
+        entries = [_ENTRY.unpack_from(directory, i) for i in range(0, len(directory) - 127, 128)]
+        if not entries or entries[0][2] != ROOT:
+            raise Corrupt("missing root entry")
+        self._entries = {}
+        self._walk(entries)
+
+        # mini stream (held in the root entry's chain) and MiniFAT
+        root = entries[0]
+        self._minifat = self._unpack(self._regular_stream(minifat_sector, None).read())
+        self._ministream = self._regular_stream(root[9], self._entry_size(root))
+
+    def _walk(self, entries):
+        # walk the sibling trees from the root's child, descending into storages; the
+        # stack holds (entry index, path of the storage it belongs to) so depth costs no recursion
+        stack = [(entries[0][6], ())]
+        seen = set()
+        while stack:
+            index, path = stack.pop()
+            if index == NOSTREAM:
+                continue
+            if index >= len(entries) or index in seen:
+                raise Corrupt("invalid directory tree")
+            seen.add(index)
+            entry = entries[index]
+            name = entry[0][:max(entry[1] - 2, 0)].decode('utf-16-le', 'replace')
+            key = path + (name.lower(),)
+            if entry[2] == STREAM:
+                self._entries['/'.join(key)] = entry
+            elif entry[2] == STORAGE:
+                stack.append((entry[6], key))
+            stack.extend(((entry[4], path), (entry[5], path)))
+
+    def _entry_size(self, entry):
+        # version 3 files only define the low 32 bits of the size
+        return entry[10] & 0xFFFFFFFF if self._sector_size == 512 else entry[10]
+
+    def _unpack(self, data):
+        values = array('I')
+        values.frombytes(data[:len(data) - len(data) % 4])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def _chain(self, table, start, count):
+        """returns: up to count sector numbers from start, following table"""
+        chain = []
+        sector = start
+        limit = len(table) if count is None else min(count, len(table))
+        while sector < MAXREGSECT and len(chain) < limit:
+            if sector >= len(table):
+                raise Corrupt("sector chain leaves the FAT")
+            chain.append(sector)
+            sector = table[sector]
+        return chain
+
+    def _regular_stream(self, start, size):
+        sector_size = self._sector_size
+        count = None if size is None else -(-size // sector_size)
+        chain = self._chain(self._fat, start, count)
+        if size is None:
+            size = len(chain) * sector_size
+        elif len(chain) * sector_size < size:
+            raise Corrupt("sector chain is shorter than the stream")
+        return Stream(self._read_at, chain, sector_size, sector_size, size)
+
+    def _find(self, name):
+        if isinstance(name, (list, tuple)):
+            name = '/'.join(name)
+        return self._entries.get(name.lower().strip('/'))
+
+    def exists(self, name):
+        return self._find(name) is not None
+
+    def get_size(self, name):
+        entry = self._find(name)
+        if entry is None:
+            raise OSError("stream not found: %s" % name)
+        return self._entry_size(entry)
+
+    def openstream(self, name):
+        """returns: Stream of the named stream ('WordDocument', '1Table', 'ObjectPool/...')"""
+        entry = self._find(name)
+        if entry is None:
+            raise OSError("stream not found: %s" % name)
+        size = self._entry_size(entry)
+        if size < self._cutoff:
+            chain = self._chain(self._minifat, entry[9], -(-size // 64))
+            if len(chain) * 64 < size:
+                raise Corrupt("mini sector chain is shorter than the stream")
+            return Stream(self._ministream.read_at, chain, 64, 0, size)
+        return self._regular_stream(entry[9], size)
+
+    def get_metadata(self):
+        """returns: olefile.OleMetadata, parsed by olefile over this reader"""
+        # the whole file, as a stream of one sector
+        ole = olefile.OleFileIO(Stream(self._read_at, [0], self._length, 0, self._length))
+        try:
+            return ole.get_metadata()
+        finally:
+            ole.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._view is not None:
+            # releasing the views lets the caller close an mmap afterwards
+            self._view[1].release()
+            self._view[0].release()
+            self._view = None
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import deque, namedtuple
+import doctotext
+from doctotext import cleaning
+
+# paragraph marks and cell/row marks end a paragraph
+PARAGRAPH_MARKS = re.compile('[\r\x07]')
+
+
+class Chunk(namedtuple('Chunk', ['text', 'cp_start', 'cp_end'])):
+    """
+    A run of whole paragraphs. cp_start/cp_end are character positions in the
+    same coordinates as the PlcPcd aCP array (Document.piece_index maps a CP
+    to its piece).
+    """
+    __slots__ = ()
+
+
+def iter_paragraphs(segments, max_chars: int):
+    """
+    @param segments: iterable of (cp_start, cp_end, text) in document order
+    @param max_chars: paragraphs longer than this are split
+    yields: (text, cp_start, cp_end) for each paragraph, including its mark
+    """
+    parts = []
+    size = 0
+    start_cp = None
+    for cp, cp_end, text in segments:
+        # CPs count UTF-16 code units; only text with astral characters needs recounting
+        exact = len(text) == cp_end - cp
+        pos = 0
+        while pos < len(text):
+            if start_cp is None:
+                start_cp = cp
+            limit = min(len(text), pos + max_chars - size)
+            match = PARAGRAPH_MARKS.search(text, pos, limit)
+            end = match.end() if match else limit
+            part = text[pos:end]
+            cp += len(part) if exact else len(part.encode('utf-16-le')) // 2
+            parts.append(part)
+            size += len(part)
+            pos = end
+            if match or size >= max_chars:
+                yield ''.join(parts), start_cp, cp
+                parts, size, start_cp = [], 0, None
+    if parts:
+        yield ''.join(parts), start_cp, cp
+
+
+def iter_chunks(source, max_chars: int, overlap: int = 0, clean: bool = False,
+                chunk_chars: int = 0x10000, limits=None):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param max_chars: maximum characters per chunk
+    @param overlap: up to this many characters of trailing whole paragraphs are
+                    repeated at the start of the next chunk
+    @param clean: clean each paragraph with cleaning.Cleaner before packing
+    @param chunk_chars: read step, see iter_text
+    @param limits: optional limits.Limits, see iter_text
+    yields: Chunk of paragraph-aligned text, streamed as the document is decoded
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+    cleaner = cleaning.Cleaner() if clean else None
+    paragraphs = iter_paragraphs(doctotext._iter_segments(source, chunk_chars, limits=limits), max_chars)
+
+    current = deque()
+    size = fresh = 0
+    for text, cp_start, cp_end in paragraphs:
+        if cleaner is not None:
+            text = cleaner.feed(text)
+        if current and size + len(text) > max_chars:
+            if fresh:
+                yield _chunk(current)
+            # keep trailing paragraphs as overlap, as long as the next chunk still fits
+            kept = 0
+            for item in reversed(current):
+                if kept + len(item[0]) > overlap:
+                    break
+                kept += len(item[0])
+            while current and size > kept:
+                size -= len(current.popleft()[0])
+            while current and size + len(text) > max_chars:
+                size -= len(current.popleft()[0])
+            fresh = 0
+        current.append((text, cp_start, cp_end))
+        size += len(text)
+        fresh += 1
+    if current and fresh:
+        yield _chunk(current)
+
+
+def _chunk(paragraphs):
+    return Chunk(''.join(p[0] for p in paragraphs), paragraphs[0][1], paragraphs[-1][2])
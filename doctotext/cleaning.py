@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+FIELD_BEGIN, FIELD_SEPARATOR, FIELD_END = '\x13', '\x14', '\x15'
+
+# Word control characters outside of fields, applied with one str.translate
+TRANSLATE_TABLE = str.maketrans({
+    '\x0D': '\n',    # paragraph mark
+    '\x07': '\t',    # cell / row mark
+    '\x0B': '\n',    # line break
+    '\x0C': '\n',    # page / section break
+    '\x0E': '\n',    # column break
+    '\x1E': '-',     # non-breaking hyphen
+    '\x1F': None,    # optional hyphen
+    '\x01': None,    # picture anchor
+    '\x02': None,    # auto-numbered footnote reference
+    '\x05': None,    # annotation reference
+    '\x08': None,    # drawn object anchor
+    # field marks never reach the output, including stray ones outside any field
+    FIELD_BEGIN: None,
+    FIELD_SEPARATOR: None,
+    FIELD_END: None,
+})
+
+_FIELD_MARKS = re.compile('([\x13\x14\x15])')
+
+
+class Cleaner:
+    """
+    Streaming cleaner for decoded Word text. Field instructions (between 0x13
+    and 0x14) are dropped and field results (between 0x14 and 0x15) kept, at
+    any nesting depth; remaining control characters go through TRANSLATE_TABLE.
+    State is carried between feed() calls, so text may be split anywhere.
+    """
+    __slots__ = ('_stack',)
+
+    def __init__(self):
+        # one entry per open field: True once its separator has been seen
+        self._stack = []
+
+    def feed(self, text: str):
+        """returns: the cleaned part of text that can be emitted"""
+        stack = self._stack
+        if not stack and FIELD_BEGIN not in text:
+            return text.translate(TRANSLATE_TABLE)
+
+        output = []
+        for part in _FIELD_MARKS.split(text):
+            if part == FIELD_BEGIN:
+                stack.append(False)
+            elif part == FIELD_SEPARATOR:
+                if stack:
+                    stack[-1] = True
+            elif part == FIELD_END:
+                if stack:
+                    stack.pop()
+            elif part and all(stack):
+                output.append(part)
+        return ''.join(output).translate(TRANSLATE_TABLE)
+
+
+def clean(text: str):
+    """returns: text with field codes and control characters cleaned in one pass"""
+    return Cleaner().feed(text)
+
+
+def clean_spans(spans):
+    """returns: list of cleaned spans, with field state carried across them"""
+    cleaner = Cleaner()
+    return [cleaner.feed(span) for span in spans]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import sys
+import time
+from doctotext.batch import extract_many
+from doctotext.limits import Limits
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='doctotext',
+        description='Convert Microsoft Word 97-2003 (.doc) files to text.',
+        epilog="'doctotext serve --help' describes the extraction daemon.")
+    parser.add_argument('paths', nargs='*',
+                        help="files or directories to convert; '-' or none reads paths from stdin")
+    parser.add_argument('-o', '--output-dir',
+                        help='write one .txt per document under this directory')
+    parser.add_argument('--jsonl',
+                        help="write a JSON line per document (path, text, nFib, seconds, error); '-' for stdout")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--executor', choices=('process', 'thread'), default='process')
+    parser.add_argument('--chunksize', type=int, default=8,
+                        help='documents sent to a worker per task')
+    parser.add_argument('--ext', action='append', default=None,
+                        help='file extension to pick up when crawling directories (default: .doc)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='give up on a document after this many seconds')
+    parser.add_argument('--max-bytes', type=int, default=0x7FFFFFFF,
+                        help='skip documents whose WordDocument or table stream is larger')
+    parser.add_argument('--max-chars', type=int, default=None,
+                        help='skip documents with more characters of text')
+    parser.add_argument('--manifest',
+                        help='record finished paths here and skip them on the next run')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='with --manifest, convert files that failed previously again')
+    parser.add_argument('--progress', type=float, default=2.0,
+                        help='seconds between throughput reports on stderr (0 disables)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no progress or summary output')
+    return parser
+
+
+def iter_paths(paths, extensions, stdin=sys.stdin):
+    """
+    @param paths: files or directories; '-' (or no paths) reads one path per line from stdin
+    @param extensions: lowercase extensions to pick up inside directories
+    yields: file paths, lazily, so crawls of any size stream through
+    """
+    for path in paths or ['-']:
+        if path == '-':
+            for line in stdin:
+                line = line.rstrip('\r\n')
+                if line:
+                    yield line
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in extensions:
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def load_manifest(path, retry_errors=False):
+    """returns: set of paths already finished according to the manifest"""
+    done = set()
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            status, _, name = line.rstrip('\n').partition('\t')
+            if status == 'ok' or (status == 'error' and not retry_errors):
+                done.add(name)
+    return done
+
+
+def output_path(output_dir, path):
+    """Mirrors the source path under output_dir so names cannot collide."""
+    relative = os.path.splitdrive(os.path.abspath(path))[1].lstrip(os.sep)
+    return os.path.join(output_dir, relative + '.txt')
+
+
+class Progress:
+    """Throughput counters, reported to stderr every `interval` seconds."""
+
+    def __init__(self, interval: float, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.files = self.errors = self.bytes = 0
+        self.start = self._last = time.perf_counter()
+
+    def update(self, size: int, ok: bool):
+        self.files += 1
+        self.bytes += size
+        self.errors += not ok
+        now = time.perf_counter()
+        if self.interval and now - self._last >= self.interval:
+            self._last = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        print('%s%d files (%d errors), %.1f files/s, %.2f MB/s' % (
+            'done: ' if final else '', self.files, self.errors,
+            self.files / elapsed, self.bytes / elapsed / 1e6), file=self.stream, flush=True)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['serve']:
+        from doctotext import server
+        return server.main(argv[1:])
+    args = build_parser().parse_args(argv)
+    if args.output_dir is None and args.jsonl is None:
+        args.jsonl = '-'
+    extensions = {e.lower() if e.startswith('.') else '.' + e.lower() for e in args.ext or ['.doc']}
+
+    done = load_manifest(args.manifest, retry_errors=args.retry_errors)
+    paths = (p for p in iter_paths(args.paths, extensions) if p not in done)
+
+    jsonl = None
+    if args.jsonl == '-':
+        jsonl = sys.stdout
+    elif args.jsonl is not None:
+        jsonl = open(args.jsonl, 'a' if args.manifest else 'w', encoding='utf-8')
+    manifest = open(args.manifest, 'a', encoding='utf-8') if args.manifest else None
+    progress = Progress(0 if args.quiet else args.progress)
+    limits = Limits(max_stream_bytes=args.max_bytes, max_chars=args.max_chars, timeout=args.timeout)
+
+    try:
+        for result in extract_many(paths, workers=args.workers, executor=args.executor,
+                                   chunksize=args.chunksize, limits=limits):
+            if result.ok and args.output_dir is not None:
+                target = output_path(args.output_dir, result.source)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'w', encoding='utf-8') as f:
+                    f.write(result.text)
+            if jsonl is not None:
+                jsonl.write(json.dumps({
+                    'path': result.source,
+                    'text': result.text,
+                    'nFib': result.nfib,
+                    'seconds': round(result.seconds, 6),
+                    'error': None if result.ok else '%s: %s' % result.error}) + '\n')
+
+            # the manifest entry is written last so an interrupted file is redone
+            if manifest is not None:
+                if jsonl is not None:
+                    jsonl.flush()
+                manifest.write('%s\t%s\n' % ('ok' if result.ok else 'error', result.source))
+                manifest.flush()
+            try:
+                size = os.path.getsize(result.source)
+            except OSError:
+                size = 0
+            progress.update(size, result.ok)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if jsonl is not None and jsonl is not sys.stdout:
+            jsonl.close()
+        if manifest is not None:
+            manifest.close()
+        if not args.quiet:
+            progress.report(final=True)
+    return 0 if progress.errors == 0 else 1
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+from time import perf_counter
+
+# Compressed (8-bit) text is Latin-1 except for these bytes [MS-DOC 2.4.1]
+COMPRESSED_MAP = {
+    0x82: 0x201A, 0x83: 0x0192, 0x84: 0x201E, 0x85: 0x2026, 0x86: 0x2020,
+    0x87: 0x2021, 0x88: 0x02C6, 0x89: 0x2030, 0x8A: 0x0160, 0x8B: 0x2039,
+    0x8C: 0x0152, 0x91: 0x2018, 0x92: 0x2019, 0x93: 0x201C, 0x94: 0x201D,
+    0x95: 0x2022, 0x96: 0x2013, 0x97: 0x2014, 0x98: 0x02DC, 0x99: 0x2122,
+    0x9A: 0x0161, 0x9B: 0x203A, 0x9C: 0x0153, 0x9F: 0x0178}
+
+# 256-character table for codecs.charmap_decode: one C-level pass per run
+DECODING_TABLE = ''.join(chr(COMPRESSED_MAP.get(b, b)) for b in range(256))
+
+# inverse, for writing compressed text
+ENCODING_TABLE = codecs.charmap_build(DECODING_TABLE)
+
+
+def decode_compressed(data):
+    """@param data: bytes-like compressed text; returns: str"""
+    return codecs.charmap_decode(data, 'strict', DECODING_TABLE)[0]
+
+
+def decode_uncompressed(data):
+    """@param data: bytes-like UTF-16LE text; returns: str"""
+    return str(data, 'utf-16-le', 'ignore')
+
+
+def encode_compressed(text: str):
+    """returns: text as compressed bytes; raises UnicodeEncodeError if it does not fit"""
+    return codecs.charmap_encode(text, 'strict', ENCODING_TABLE)[0]
+
+
+def iter_runs(pieces):
+    """
+    Merges pieces that are adjacent in CP order, contiguous in the WordDocument
+    stream and share fCompressed into single ranges.
+    @param pieces: PieceTable
+    yields: (cp_start, cp_end, byte_start, byte_end, compressed)
+    """
+    run = None
+    for current in pieces.iter_ranges():
+        if run is not None and run[3] == current[2] and run[4] == current[4]:
+            run = (run[0], current[1], run[2], current[3], run[4])
+            continue
+        if run is not None:
+            yield run
+        run = current
+    if run is not None:
+        yield run
+
+
+def decode_spans(word_data, pieces, limits=None):
+    """
+    @param word_data: WordDocument stream (bytes-like)
+    @param pieces: PieceTable
+    @param limits: optional limits.Limits whose deadline is checked per run
+    returns: list of decoded text, one entry per run of coalesced pieces
+    """
+    spans = []
+    for _, _, offset_s, offset_e, compressed in iter_runs(pieces):
+        if limits is not None:
+            limits.check_deadline()
+        if compressed:
+            spans.append(decode_compressed(word_data[offset_s:offset_e]))
+        else:
+            spans.append(decode_uncompressed(word_data[offset_s:offset_e]))
+    return spans
+
+
+def decode_text(word_data, pieces):
+    """returns: the document text as a single string"""
+    return ''.join(decode_spans(word_data, pieces))
+
+
+def iter_segments(stream, pieces, chunk_chars: int = 0x10000, stats=None, limits=None):
+    """
+    Reads the text piece run by piece run, in bounded steps.
+    @param stream: seekable WordDocument stream
+    @param pieces: PieceTable
+    @param chunk_chars: maximum number of characters read and decoded at once
+    @param stats: optional instrument.Stats; decode time excludes time spent
+                  by the consumer between steps
+    @param limits: optional limits.Limits whose deadline is checked per step
+    yields: (cp_start, cp_end, text) for each decoded step
+    """
+    if stats is not None:
+        mark = perf_counter()
+    for cp, _, offset_s, offset_e, compressed in iter_runs(pieces):
+        run_cp, run_offset = cp, offset_s
+        if compressed:
+            step = chunk_chars
+        else:
+            step = 2 * chunk_chars
+            decoder = codecs.getincrementaldecoder('utf-16-le')(errors='ignore')
+        while offset_s < offset_e:
+            if limits is not None:
+                limits.check_deadline()
+            # seek every step, the stream may be shared with other readers in between
+            stream.seek(offset_s)
+            data = stream.read(min(step, offset_e - offset_s))
+            if not data:
+                break
+            offset_s += len(data)
+            if compressed:
+                text = decode_compressed(data)
+                cp_end = cp + len(data)
+            else:
+                text = decoder.decode(data, final=offset_s >= offset_e)
+                # bytes held back by the decoder (a split surrogate pair) belong to the next step
+                cp_end = run_cp + (offset_s - run_offset - len(decoder.getstate()[0])) // 2
+            if stats is not None:
+                stats.bytes_read += len(data)
+                mark = stats.mark('decode', mark)
+            if text:
+                yield cp, cp_end, text
+                if stats is not None:
+                    mark = perf_counter()
+            cp = cp_end
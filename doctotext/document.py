@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_right
+from functools import cached_property
+from doctotext import builders, cleaning, decoding
+from doctotext.errors import Corrupt
+from doctotext.limits import DEFAULT_LIMITS
+from doctotext.sources import container_errors, open_ole, open_stream
+from doctotext.utilities import filetime_to_datetime
+
+# OleMetadata attributes read from SummaryInformation / DocumentSummaryInformation
+SUMMARY_FIELDS = (
+    'title', 'subject', 'author', 'keywords', 'comments', 'template', 'last_saved_by',
+    'revision_number', 'total_edit_time', 'last_printed', 'create_time', 'last_saved_time',
+    'num_pages', 'num_words', 'num_chars', 'creating_application', 'security',
+    'category', 'manager', 'company', 'lines', 'paragraphs', 'chars_with_spaces',
+    'content_type', 'content_status', 'language', 'doc_version')
+
+
+class Document:
+    """
+    An open .doc file. The FIB, piece table, text and metadata are each
+    computed on first use and kept, so repeated reads against one document
+    only pay for what they have not asked for before.
+
+        with Document(path) as doc:
+            head = doc.extract_range(0, 4096)
+            saved = doc.metadata['saved']
+    """
+
+    def __init__(self, source, limits=None):
+        """
+        @param source: path to *.doc file, bytes-like object, mmap or binary file object
+        @param limits: limits.Limits for this document, defaults to DEFAULT_LIMITS;
+                       the timeout counts from here
+        """
+        self.limits = (limits or DEFAULT_LIMITS).start()
+        self._ole = open_ole(source)
+
+    def _open_stream(self, name: str):
+        return open_stream(self._ole, name, self.limits)
+
+    @cached_property
+    def word_stream(self):
+        return self._open_stream('WordDocument')
+
+    @cached_property
+    def fib(self):
+        self.word_stream.seek(0)
+        return builders.check_encryption(builders.read_fib(self.word_stream))
+
+    @cached_property
+    def piece_table(self):
+        fib = self.fib
+        self.limits.check_deadline()
+        table_stream = self._open_stream(fib.table)
+        table_stream.seek(fib.fcClx)
+        clx = table_stream.read(fib.lcbClx)
+        if len(clx) < fib.lcbClx:
+            raise Corrupt("Clx runs past the end of the %s stream" % fib.table)
+        pieces = builders.parse_clx(clx, self.limits)
+        self.limits.check_chars(pieces.cp[-1] if len(pieces.cp) else 0)
+        return builders.check_piece_table(pieces, self._ole.get_size('WordDocument'))
+
+    @cached_property
+    def text(self):
+        """the whole document text, decoded once"""
+        return ''.join(text for _, _, text in self.iter_segments(0x100000))
+
+    @cached_property
+    def saved(self):
+        """datetime of the last save from the FIB, or None when Word left it empty"""
+        fib = self.fib
+        if not fib.dwLowDateTime and not fib.dwHighDateTime:
+            return None
+        try:
+            return filetime_to_datetime(fib.dwLowDateTime, fib.dwHighDateTime)
+        except (ValueError, OverflowError, OSError) as e:
+            raise Corrupt("FIB save time is out of range") from e
+
+    @cached_property
+    def metadata(self):
+        """
+        returns: {'saved': datetime or None, 'nfib': int, **summary properties},
+                 with only the SummaryInformation properties present in the file
+        """
+        output = {'saved': self.saved, 'nfib': self.fib.nFib}
+        with container_errors():
+            summary = self._ole.get_metadata()
+        codepage = 'cp%d' % summary.codepage if summary.codepage else 'latin-1'
+        for name in SUMMARY_FIELDS:
+            value = getattr(summary, name, None)
+            if isinstance(value, bytes):
+                try:
+                    value = value.decode(codepage)
+                except (LookupError, UnicodeDecodeError):
+                    value = value.decode('latin-1')
+                value = value.rstrip('\x00')
+            if value is not None:
+                output[name] = value
+        return output
+
+    def iter_segments(self, chunk_chars: int = 0x10000, stats=None):
+        """yields: (cp_start, cp_end, text) in bounded steps, see decoding.iter_segments"""
+        return decoding.iter_segments(self.word_stream, self.piece_table, chunk_chars, stats, self.limits)
+
+    def iter_text(self, chunk_chars: int = 0x10000, clean: bool = False):
+        """
+        @param chunk_chars: maximum number of characters read and decoded at once
+        @param clean: drop field instructions and map Word control characters (see cleaning)
+        yields: text of the document in order, served from text once it has been decoded
+        """
+        if 'text' in self.__dict__:
+            chunks = (self.text[i:i + chunk_chars] for i in range(0, len(self.text), chunk_chars))
+        else:
+            chunks = (text for _, _, text in self.iter_segments(chunk_chars))
+        cleaner = cleaning.Cleaner() if clean else None
+        for chunk in chunks:
+            if cleaner is not None:
+                chunk = cleaner.feed(chunk)
+            if chunk:
+                yield chunk
+
+    def piece_index(self, cp: int):
+        """returns: index into the PlcPcd of the piece holding character position cp"""
+        pieces = self.piece_table
+        if not 0 <= cp < (pieces.cp[-1] if len(pieces.cp) else 0):
+            raise IndexError("character position out of range: %d" % cp)
+        return bisect_right(pieces.cp, cp) - 1
+
+    def extract_range(self, cp_start: int, cp_end: int):
+        """
+        @param cp_start: first character position
+        @param cp_end: character position to stop before
+        returns: text of [cp_start, cp_end), reading only the pieces that cover it
+        """
+        pieces = self.piece_table
+        cp = pieces.cp
+        cp_start = max(cp_start, 0)
+        cp_end = min(cp_end, cp[-1]) if len(cp) else 0
+        text = []
+
+        # binary search for the piece holding cp_start, then walk forward
+        i = max(bisect_right(cp, cp_start) - 1, 0)
+        while i < len(pieces) and cp[i] < cp_end:
+            start = max(cp[i], cp_start)
+            end = min(cp[i + 1], cp_end)
+            if start < end:
+                offset, _ = pieces.byte_range(i)
+                if pieces.compressed[i]:
+                    self.word_stream.seek(offset + (start - cp[i]))
+                    text.append(decoding.decode_compressed(self.word_stream.read(end - start)))
+                else:
+                    self.word_stream.seek(offset + 2 * (start - cp[i]))
+                    text.append(decoding.decode_uncompressed(self.word_stream.read(2 * (end - start))))
+            i += 1
+        return ''.join(text)
+
+    def extract_stories(self, stories=None):
+        """
+        @param stories: story names from builders.STORIES, or None for all of them
+        returns: {story: text}, decoding only the pieces the requested stories cover
+        """
+        ranges = builders.story_ranges(self.fib)
+        if stories is None:
+            stories = list(ranges)
+        elif isinstance(stories, str):
+            stories = [stories]
+        unknown = set(stories) - set(ranges)
+        if unknown:
+            raise ValueError("unknown stories: %s" % ', '.join(sorted(unknown)))
+        return {name: self.extract_range(*ranges[name]) for name in stories}
+
+    def close(self):
+        self._ole.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
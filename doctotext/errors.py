@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+
+class DocError(Exception):
+    """Base class for errors raised while reading a .doc file."""
+
+
+class UnsupportedVersion(DocError):
+    """The file is not a Word 97 or later document (nFib outside builders.FCLCB_SECTIONS)."""
+
+
+class Encrypted(DocError):
+    """The document is encrypted or XOR-obfuscated (fEncrypted / fObfuscated in the FibBase)."""
+
+
+class Corrupt(DocError):
+    """A structure contradicts the spec or points outside the streams it refers to."""
+
+
+class LimitExceeded(DocError):
+    """A bound of limits.Limits was reached before the document was read."""
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from time import perf_counter
+
+STAGES = ('open', 'read_word', 'fib', 'read_table', 'clx', 'decode')
+
+
+class Stats:
+    """
+    Per-document measurements filled in when passed as stats= to extract_text
+    or iter_text: wall time per stage, bytes read from the container, piece
+    count, compressed/uncompressed text bytes and nFib.
+    on_event, if given, is called as on_event(stage, seconds, stats) as each
+    stage finishes.
+    """
+    __slots__ = ('stages', 'bytes_read', 'pieces', 'compressed_bytes', 'uncompressed_bytes',
+                 'nfib', 'on_event')
+
+    def __init__(self, on_event=None):
+        self.stages = {}
+        self.bytes_read = 0
+        self.pieces = 0
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.nfib = None
+        self.on_event = on_event
+
+    def mark(self, stage: str, start: float):
+        """
+        Records the time since start against stage.
+        returns: perf_counter() now, the start of the next stage
+        """
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - start)
+        if self.on_event is not None:
+            self.on_event(stage, now - start, self)
+        return now
+
+    def count_pieces(self, pieces):
+        """Adds piece count and text byte totals of a PieceTable."""
+        self.pieces += len(pieces)
+        for _, _, offset_s, offset_e, compressed in pieces.iter_ranges():
+            if compressed:
+                self.compressed_bytes += offset_e - offset_s
+            else:
+                self.uncompressed_bytes += offset_e - offset_s
+
+    @property
+    def seconds(self):
+        return sum(self.stages.values())
+
+    def as_dict(self):
+        return {'stages': dict(self.stages), 'seconds': self.seconds, 'bytes_read': self.bytes_read,
+                'pieces': self.pieces, 'compressed_bytes': self.compressed_bytes,
+                'uncompressed_bytes': self.uncompressed_bytes, 'nfib': self.nfib}
+
+
+class Collector:
+    """
+    Thread-safe running totals over many Stats, e.g. for a metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.errors = 0
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.bytes_read = 0
+        self.pieces = 0
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.nfib = {}
+
+    def add(self, stats: Stats, error: bool = False):
+        with self._lock:
+            self.documents += 1
+            self.errors += bool(error)
+            for stage, seconds in stats.stages.items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.bytes_read += stats.bytes_read
+            self.pieces += stats.pieces
+            self.compressed_bytes += stats.compressed_bytes
+            self.uncompressed_bytes += stats.uncompressed_bytes
+            if stats.nfib is not None:
+                key = '0x%04X' % stats.nfib
+                self.nfib[key] = self.nfib.get(key, 0) + 1
+
+    def as_dict(self):
+        """returns: flat counters, named like Prometheus metrics"""
+        with self._lock:
+            output = {
+                'doctotext_documents_total': self.documents,
+                'doctotext_errors_total': self.errors,
+                'doctotext_bytes_read_total': self.bytes_read,
+                'doctotext_pieces_total': self.pieces,
+                'doctotext_compressed_bytes_total': self.compressed_bytes,
+                'doctotext_uncompressed_bytes_total': self.uncompressed_bytes}
+            for stage, seconds in self.stage_seconds.items():
+                output['doctotext_stage_seconds_total{stage="%s"}' % stage] = seconds
+            for nfib, count in self.nfib.items():
+                output['doctotext_documents_by_nfib_total{nfib="%s"}' % nfib] = count
+            return output
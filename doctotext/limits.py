@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+from doctotext.errors import LimitExceeded
+
+
+class Limits:
+    """
+    Bounds on the work spent on one document; None disables a bound.
+    max_stream_bytes: size of the WordDocument and table streams
+    max_pieces: number of pieces in the PlcPcd
+    max_chars: number of characters of text (the last aCP)
+    timeout: wall-clock seconds, checked between stages and decode steps
+    Each check raises errors.LimitExceeded. Sizes are checked before anything
+    is allocated for them.
+    """
+    __slots__ = ('max_stream_bytes', 'max_pieces', 'max_chars', 'timeout', 'deadline')
+
+    def __init__(self, max_stream_bytes: int = 0x7FFFFFFF, max_pieces: int = None,
+                 max_chars: int = None, timeout: float = None):
+        self.max_stream_bytes = max_stream_bytes
+        self.max_pieces = max_pieces
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.deadline = None
+
+    def start(self):
+        """returns: a copy for one document, with its deadline counted from now"""
+        limits = Limits(self.max_stream_bytes, self.max_pieces, self.max_chars, self.timeout)
+        if self.timeout is not None:
+            limits.deadline = perf_counter() + self.timeout
+        return limits
+
+    def check_stream(self, name: str, size: int):
+        if self.max_stream_bytes is not None and size > self.max_stream_bytes:
+            raise LimitExceeded("%s stream is %d bytes, limit is %d" % (name, size, self.max_stream_bytes))
+
+    def check_pieces(self, count: int):
+        if self.max_pieces is not None and count > self.max_pieces:
+            raise LimitExceeded("%d pieces, limit is %d" % (count, self.max_pieces))
+
+    def check_chars(self, count: int):
+        if self.max_chars is not None and count > self.max_chars:
+            raise LimitExceeded("%d characters, limit is %d" % (count, self.max_chars))
+
+    def check_deadline(self):
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise LimitExceeded("timeout of %gs exceeded" % self.timeout)
+
+
+DEFAULT_LIMITS = Limits()
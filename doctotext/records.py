@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import struct
+from collections import namedtuple
+from doctotext.utilities import formatted_hex
+
+
+class Record(tuple):
+    """
+    Base for fixed-layout records produced by record(). Each subclass carries
+    a precompiled little-endian struct.Struct so a whole section is decoded
+    with a single unpack_from call.
+    """
+    __slots__ = ()
+    _struct = None
+    _bits = {}
+    _names = frozenset()
+
+    @classmethod
+    def unpack_from(cls, buffer, offset: int = 0):
+        """
+        @param buffer: bytes, bytearray, memoryview or any buffer object
+        @param offset: byte offset of the record within buffer
+        returns: record instance
+        """
+        return tuple.__new__(cls, cls._struct.unpack_from(buffer, offset))
+
+    def pack(self):
+        """returns: the record re-encoded as bytes"""
+        return self._struct.pack(*self)
+
+    def hex(self, name: str):
+        """returns: formatted_hex of a field, computed on demand"""
+        return formatted_hex(getattr(self, name))
+
+    def as_dict(self, hex: bool = False):
+        """
+        @param hex: also emit a '<name>_hex' entry for every raw field
+        returns: plain dict of the fields, with bit containers expanded
+        """
+        output = {}
+        for key, value in zip(self._fields, self):
+            output[key] = value
+            if hex:
+                output[key + '_hex'] = formatted_hex(value)
+        for key, subfields in self._bits.items():
+            output.pop(key)
+            for name, _, _ in subfields:
+                output[name] = getattr(self, name)
+        return output
+
+
+def _bit_getter(index: int, shift: int, mask: int):
+    def getter(self):
+        return (self[index] >> shift) & mask
+    return getter
+
+
+def record(typename: str, fields, bits: dict = None):
+    """
+    @param typename: name of the generated class
+    @param fields: sequence of (name, struct format character) pairs
+    @param bits: optional {field: [(name, shift, width), ...]} bit fields
+                 exposed as read-only properties of the record
+    returns: a namedtuple-style Record subclass
+    """
+    names = [name for name, _ in fields]
+    layout = struct.Struct('<' + ''.join(fmt for _, fmt in fields))
+    fields_cls = namedtuple(typename, names)
+    namespace = {'__slots__': (), '_struct': layout, 'size': layout.size, '_bits': bits or {}}
+    for key, subfields in namespace['_bits'].items():
+        index = names.index(key)
+        for name, shift, width in subfields:
+            namespace[name] = property(_bit_getter(index, shift, (1 << width) - 1))
+            names.append(name)
+    namespace['_names'] = frozenset(names)
+    return type(typename, (Record, fields_cls), namespace)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import namedtuple
+from itertools import islice
+import doctotext
+
+
+class Hit(namedtuple('Hit', ['pattern', 'text', 'cp_start', 'cp_end'])):
+    """
+    One match. pattern is the pattern as passed in, text the matched text and
+    cp_start/cp_end its character positions (see extract_range).
+    """
+    __slots__ = ()
+
+
+def _compile(patterns, ignore_case):
+    """returns: list of (pattern as given, compiled regex)"""
+    if isinstance(patterns, (str, re.Pattern)):
+        patterns = [patterns]
+    flags = re.IGNORECASE if ignore_case else 0
+    compiled = []
+    for pattern in patterns:
+        if isinstance(pattern, re.Pattern):
+            regex = re.compile(pattern.pattern, pattern.flags | flags) if flags else pattern
+        else:
+            regex = re.compile(re.escape(pattern), flags)
+        compiled.append((pattern, regex))
+    return compiled
+
+
+def _cp_at(buffer: str, buffer_cp: int, exact: bool, offset: int):
+    # CPs count UTF-16 code units; only text with astral characters needs recounting
+    if exact:
+        return buffer_cp + offset
+    return buffer_cp + len(buffer[:offset].encode('utf-16-le')) // 2
+
+
+def iter_hits(source, patterns, ignore_case: bool = False, window: int = 1024,
+              chunk_chars: int = 0x10000, limits=None):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param patterns: keyword strings (matched literally) and/or compiled regexes
+    @param ignore_case: match case-insensitively
+    @param window: longest match guaranteed to be found across a read boundary;
+                   window - 1 characters are carried from one step to the next
+    @param chunk_chars: read step, see iter_text
+    @param limits: optional limits.Limits, see iter_text
+    yields: Hit in document order, decoding only as far as the consumer reads
+    """
+    compiled = _compile(patterns, ignore_case)
+    keep = max(window - 1, 0)
+    last_end = [0] * len(compiled)
+    buffer, buffer_cp, buffer_end = '', 0, 0
+
+    segments = doctotext._iter_segments(source, chunk_chars, limits=limits)
+    final = False
+    try:
+        while not final:
+            segment = next(segments, None)
+            if segment is None:
+                final = True
+            else:
+                cp, cp_end, text = segment
+                if cp != buffer_end:
+                    buffer, buffer_cp = '', cp
+                buffer += text
+                buffer_end = cp_end
+
+            # matches starting in the carried tail are left for the next step
+            commit = len(buffer) if final else max(len(buffer) - keep, 0)
+            exact = len(buffer) == buffer_end - buffer_cp
+            hits = []
+            for index, (pattern, regex) in enumerate(compiled):
+                for match in regex.finditer(buffer):
+                    if match.start() >= commit:
+                        break
+                    if match.end() == match.start():
+                        continue
+                    cp_start = _cp_at(buffer, buffer_cp, exact, match.start())
+                    if cp_start < last_end[index]:
+                        # already reported from the previous step's buffer
+                        continue
+                    cp_stop = _cp_at(buffer, buffer_cp, exact, match.end())
+                    last_end[index] = cp_stop
+                    hits.append((cp_start, index, Hit(pattern, match.group(), cp_start, cp_stop)))
+            hits.sort(key=lambda hit: hit[:2])
+            for hit in hits:
+                yield hit[2]
+
+            buffer_cp = _cp_at(buffer, buffer_cp, exact, commit)
+            buffer = buffer[commit:]
+    finally:
+        segments.close()
+
+
+def search(source, patterns, first_only: bool = False, ignore_case: bool = False,
+           window: int = 1024, chunk_chars: int = 0x10000, limits=None):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    @param patterns: keyword strings (matched literally) and/or compiled regexes
+    @param first_only: stop reading the document at the first hit
+    returns: list of Hit; see iter_hits for the other parameters
+    """
+    hits = iter_hits(source, patterns, ignore_case, window, chunk_chars, limits)
+    try:
+        return list(islice(hits, 1)) if first_only else list(hits)
+    finally:
+        hits.close()
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-forked extraction daemon and its client.
+
+Every message in either direction is a frame: a 4-byte big-endian length
+followed by that many bytes. A request is a JSON frame, optionally followed
+by a frame of document bytes; the response is a single JSON frame.
+
+    {"op": "extract", "path": "/data/a.doc"}                  -> 1 frame
+    {"op": "extract", "clean": true} + <document bytes>       -> 2 frames
+    {"op": "health"} / {"op": "stats"}                        -> 1 frame
+
+An extract response is {"ok": true, "text", "nfib", "seconds", "stages"}, or
+{"ok": false, "error": <exception type>, "message"} on failure. Connections
+stay open for further requests until either side closes them.
+"""
+
+import argparse
+import errno
+import json
+import mmap
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import time
+import doctotext
+from doctotext.limits import Limits
+
+_LENGTH = struct.Struct('>I')
+
+# per-worker counters in memory shared across the fork: pid, jobs, errors, bytes, seconds
+_SLOT = struct.Struct('<qQQQd')
+# master counters in front of the slots: start time, worker restarts
+_MASTER = struct.Struct('<dQ')
+
+
+class _Stop(Exception):
+    """Raised in the master by SIGTERM / SIGINT, so a blocking os.wait() returns."""
+
+
+def send_frame(sock, data: bytes):
+    if len(data) < 0x10000:
+        sock.sendall(_LENGTH.pack(len(data)) + data)
+    else:
+        # large frames are not copied just to prepend the length
+        sock.sendall(_LENGTH.pack(len(data)))
+        sock.sendall(data)
+
+
+def recv_frame(sock, max_size: int = None):
+    """returns: the frame's bytes, or None if the peer closed the connection between frames"""
+    head = _recv_exactly(sock, _LENGTH.size, eof_ok=True)
+    if head is None:
+        return None
+    size = _LENGTH.unpack(head)[0]
+    if max_size is not None and size > max_size:
+        raise ValueError("frame of %d bytes exceeds the %d byte limit" % (size, max_size))
+    return _recv_exactly(sock, size)
+
+
+def _recv_exactly(sock, size, eof_ok=False):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if eof_ok and received == 0:
+                return None
+            raise ConnectionError("connection closed mid-frame")
+        received += count
+    return bytes(buffer)
+
+
+def _remove_stale_socket(path):
+    """Unlinks path only if it is a Unix socket nothing is listening on any more."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError("%s exists and is not a socket" % os.fspath(path))
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(os.fspath(path))
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, "a server is already listening on %s" % os.fspath(path))
+
+
+class Server:
+    """
+    Listens on a Unix socket (or TCP address) and serves requests from
+    `workers` pre-forked processes that share the listening socket. Each
+    worker exits after max_jobs extractions and is replaced, which bounds the
+    effect of leaks or fragmentation from unusual documents.
+    """
+
+    def __init__(self, address, workers: int = None, max_jobs: int = 1000, limits: Limits = None,
+                 max_request: int = 256 << 20, allow_paths: bool = True, idle_timeout: float = 60.0):
+        """
+        @param address: Unix socket path, or (host, port) for TCP
+        @param workers: number of worker processes, defaults to os.cpu_count()
+        @param max_jobs: extractions per worker before it is recycled (0 disables)
+        @param limits: limits.Limits applied to every document
+        @param max_request: largest accepted frame in bytes
+        @param allow_paths: accept {"path": ...} requests that read files on the server
+        @param idle_timeout: seconds a connection may stay silent before it is dropped
+        """
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.limits = limits
+        self.max_request = max_request
+        self.allow_paths = allow_paths
+        self.idle_timeout = idle_timeout
+        self._sock = None
+        self._counters = None
+        self._pids = {}
+
+    def bind(self):
+        if isinstance(self.address, (str, os.PathLike)):
+            _remove_stale_socket(self.address)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(self.address)
+        sock.listen(128)
+        self._sock = sock
+        return sock.getsockname()
+
+    def serve_forever(self):
+        """Forks the workers and replaces any that exit until SIGTERM or SIGINT."""
+        if self._sock is None:
+            self.bind()
+        self._counters = mmap.mmap(-1, _MASTER.size + _SLOT.size * self.workers)
+        _MASTER.pack_into(self._counters, 0, time.time(), 0)
+
+        def stop(signum, frame):
+            raise _Stop()
+        previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            for slot in range(self.workers):
+                self._spawn(slot)
+            while True:
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    break
+                slot = self._pids.pop(pid, None)
+                if slot is not None:
+                    started, restarts = _MASTER.unpack_from(self._counters, 0)
+                    _MASTER.pack_into(self._counters, 0, started, restarts + 1)
+                    self._spawn(slot)
+        except _Stop:
+            pass
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            self.close()
+
+    def close(self):
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._pids.clear()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            if isinstance(self.address, (str, os.PathLike)) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid:
+            self._pids[pid] = slot
+            return
+        # worker: never return into the master's code
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            # a replacement keeps the totals of the worker it replaces
+            offset = _MASTER.size + _SLOT.size * slot
+            _SLOT.pack_into(self._counters, offset, os.getpid(), *_SLOT.unpack_from(self._counters, offset)[1:])
+            self._work(slot)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _work(self, slot):
+        jobs = 0
+        while not self.max_jobs or jobs < self.max_jobs:
+            conn, _ = self._sock.accept()
+            with conn:
+                conn.settimeout(self.idle_timeout)
+                try:
+                    while not self.max_jobs or jobs < self.max_jobs:
+                        header = recv_frame(conn, self.max_request)
+                        if header is None:
+                            break
+                        response, counted = self._handle(conn, header, slot)
+                        jobs += counted
+                        send_frame(conn, json.dumps(response).encode('utf-8'))
+                except (OSError, ValueError):
+                    # timeouts, resets and oversized frames only cost this connection
+                    continue
+
+    def _handle(self, conn, header, slot):
+        """returns: (response, 1 if an extraction was attempted else 0)"""
+        try:
+            request = json.loads(header)
+            op = request.get('op', 'extract')
+        except (ValueError, AttributeError):
+            return {'ok': False, 'error': 'BadRequest', 'message': 'header is not a JSON object'}, 0
+        if op == 'health':
+            return {'ok': True, 'pid': os.getpid(), 'workers': self.workers}, 0
+        if op == 'stats':
+            return {'ok': True, **self.stats()}, 0
+        if op != 'extract':
+            return {'ok': False, 'error': 'BadRequest', 'message': 'unknown op %r' % op}, 0
+
+        if 'path' in request:
+            if not self.allow_paths:
+                return {'ok': False, 'error': 'BadRequest', 'message': 'path requests are disabled'}, 0
+            source = request['path']
+        else:
+            source = recv_frame(conn, self.max_request)
+            if source is None:
+                raise ConnectionError("connection closed before the document")
+
+        stats = doctotext.Stats()
+        start = time.perf_counter()
+        try:
+            fib, spans = doctotext._extract(source, stats, self.limits)
+            text = ''.join(doctotext.cleaning.clean_spans(spans) if request.get('clean') else spans)
+            response = {'ok': True, 'text': text, 'nfib': fib.nFib}
+        except Exception as e:
+            response = {'ok': False, 'error': type(e).__name__, 'message': str(e)}
+        seconds = time.perf_counter() - start
+        response['seconds'] = seconds
+        response['stages'] = stats.stages
+
+        offset = _MASTER.size + _SLOT.size * slot
+        pid, jobs, errors, size, total = _SLOT.unpack_from(self._counters, offset)
+        _SLOT.pack_into(self._counters, offset, pid, jobs + 1, errors + (not response['ok']),
+                        size + stats.bytes_read, total + seconds)
+        return response, 1
+
+    def stats(self):
+        """returns: counters across all workers, named like instrument.Collector's"""
+        started, restarts = _MASTER.unpack_from(self._counters, 0)
+        output = {'doctotext_uptime_seconds': time.time() - started,
+                  'doctotext_worker_restarts_total': restarts,
+                  'doctotext_documents_total': 0, 'doctotext_errors_total': 0,
+                  'doctotext_bytes_read_total': 0, 'doctotext_seconds_total': 0.0}
+        for slot in range(self.workers):
+            pid, jobs, errors, size, seconds = _SLOT.unpack_from(self._counters, _MASTER.size + _SLOT.size * slot)
+            output['doctotext_documents_total'] += jobs
+            output['doctotext_errors_total'] += errors
+            output['doctotext_bytes_read_total'] += size
+            output['doctotext_seconds_total'] += seconds
+            output['doctotext_worker_documents_total{slot="%d"}' % slot] = jobs
+        return output
+
+
+class Client:
+    """
+    Blocking client for a Server. Reconnects once if the worker holding the
+    connection was recycled between requests.
+
+        with Client('/run/doctotext.sock') as client:
+            text = client.extract(path='/data/a.doc')['text']
+    """
+
+    def __init__(self, address, timeout: float = None):
+        """@param address: Unix socket path, or (host, port) for TCP"""
+        self.address = address
+        self.timeout = timeout
+        self._sock = None
+
+    def _connect(self):
+        family = socket.AF_UNIX if isinstance(self.address, (str, os.PathLike)) else socket.AF_INET
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.address)
+
+    def request(self, header: dict, body: bytes = None):
+        """returns: the decoded JSON response"""
+        for attempt in (0, 1):
+            if self._sock is None:
+                self._connect()
+            try:
+                send_frame(self._sock, json.dumps(header).encode('utf-8'))
+                if body is not None:
+                    send_frame(self._sock, bytes(body))
+                response = recv_frame(self._sock)
+                if response is None:
+                    raise ConnectionError("server closed the connection")
+                return json.loads(response)
+            except (ConnectionError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+
+    def extract(self, path=None, data=None, clean: bool = False):
+        """
+        @param path: path of a .doc file readable by the server
+        @param data: document bytes, sent over the connection instead of a path
+        returns: {'ok', 'text', 'nfib', 'seconds', 'stages'} or {'ok', 'error', 'message'}
+        """
+        if (path is None) == (data is None):
+            raise ValueError("pass exactly one of path and data")
+        if path is not None:
+            return self.request({'op': 'extract', 'path': os.fspath(path), 'clean': clean})
+        return self.request({'op': 'extract', 'clean': clean}, data)
+
+    def health(self):
+        return self.request({'op': 'health'})
+
+    def stats(self):
+        return self.request({'op': 'stats'})
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='doctotext serve',
+        description='Serve extractions from pre-forked workers over a local socket.')
+    parser.add_argument('--socket', help='Unix socket path to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host, used with --port')
+    parser.add_argument('--port', type=int, help='TCP port to listen on instead of a Unix socket')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--max-jobs', type=int, default=1000,
+                        help='documents per worker before it is replaced (0: never)')
+    parser.add_argument('--max-request', type=int, default=256 << 20,
+                        help='largest accepted request frame in bytes')
+    parser.add_argument('--no-paths', action='store_true',
+                        help='refuse requests that name a file on the server')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='give up on a document after this many seconds')
+    parser.add_argument('--max-chars', type=int, default=None,
+                        help='refuse documents with more characters of text')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if (args.socket is None) == (args.port is None):
+        build_parser().error('pass exactly one of --socket and --port')
+    address = args.socket if args.socket is not None else (args.host, args.port)
+    server = Server(address, workers=args.workers, max_jobs=args.max_jobs,
+                    limits=Limits(max_chars=args.max_chars, timeout=args.timeout),
+                    max_request=args.max_request, allow_paths=not args.no_paths)
+    try:
+        bound = server.bind()
+    except OSError as e:
+        print('doctotext: cannot listen on %s: %s' % (address, e.strerror or e), file=sys.stderr)
+        return 1
+    print('doctotext: serving on %s with %d workers' % (bound, server.workers),
+          file=sys.stderr, flush=True)
+    server.serve_forever()
+    return 0
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import io
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+import olefile
+from olefile.olefile import OleFileError
+from doctotext import cfb
+from doctotext.errors import Corrupt
+
+# 'cfb' reads with the built-in cfb.CompoundFile, 'olefile' with olefile, and
+# 'auto' tries cfb.CompoundFile first and falls back to olefile
+BACKENDS = ('auto', 'cfb', 'olefile')
+DEFAULT_BACKEND = 'auto'
+
+# what olefile raises for malformed containers besides its own OleFileError
+_OLEFILE_ERRORS = (OleFileError, ValueError, OverflowError, TypeError, IndexError,
+                   KeyError, struct.error)
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over any buffer (bytearray, memoryview,
+    mmap, ...). Only the ranges actually read are copied out of the buffer.
+    """
+
+    def __init__(self, buffer):
+        self._base = memoryview(buffer)
+        self._view = self._base.cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size: int = -1):
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = bytes(self._view[self._pos:end])
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            # releasing the views lets the caller close an mmap afterwards
+            self._view.release()
+            self._base.release()
+        super().close()
+
+
+class _BufferOleFile(olefile.OleFileIO):
+    """OleFileIO that closes the BufferReader it was opened on."""
+
+    def close(self):
+        super().close()
+        self.fp.close()
+
+
+def open_ole(source, backend: str = None):
+    """
+    @param source: path, bytes, bytearray, memoryview, mmap.mmap or binary file object
+    @param backend: one of BACKENDS, defaults to DEFAULT_BACKEND
+    returns: cfb.CompoundFile or olefile.OleFileIO over the source
+    raises: Corrupt if the source is not a readable compound file
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError("backend must be one of %s" % ', '.join(BACKENDS))
+    if not isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap)) \
+            and not (hasattr(source, 'read') and hasattr(source, 'seek')):
+        raise TypeError("unsupported source type: %s" % type(source).__name__)
+    rejected = None
+    if backend != 'olefile':
+        try:
+            return cfb.CompoundFile(source)
+        except Corrupt as e:
+            if backend == 'cfb':
+                raise
+            rejected = e
+    try:
+        with container_errors():
+            return _open_olefile(source)
+    except Corrupt as e:
+        # when neither reader accepts the file, cfb's reason is the one reported
+        if rejected is not None:
+            raise rejected from e.__cause__
+        raise
+
+
+def _open_olefile(source):
+    if isinstance(source, (str, os.PathLike)):
+        return olefile.OleFileIO(os.fspath(source))
+    if isinstance(source, bytes):
+        # BytesIO shares the bytes object's buffer instead of copying it
+        return olefile.OleFileIO(io.BytesIO(source))
+    if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        return _BufferOleFile(BufferReader(source))
+    return olefile.OleFileIO(source)
+
+
+def open_stream(ole, name: str, limits=None):
+    """
+    @param ole: container returned by open_ole
+    @param name: stream name, e.g. 'WordDocument'
+    @param limits: optional limits.Limits the stream size is checked against
+    returns: seekable file object over the stream
+    raises: Corrupt if the stream is missing or the container cannot produce it
+    """
+    with container_errors():
+        if not ole.exists(name):
+            raise Corrupt("missing %s stream" % name)
+        size = ole.get_size(name)
+        if limits is not None:
+            limits.check_stream(name, size)
+        return ole.openstream(name)
+
+
+@contextmanager
+def container_errors():
+    """Re-raises olefile's errors for malformed containers as Corrupt; plain I/O errors pass."""
+    try:
+        yield
+    except _OLEFILE_ERRORS as e:
+        raise Corrupt("malformed compound file: %s" % e) from e
+    except OSError as e:
+        # olefile also raises bare IOError('incorrect DIFAT') and the like; real I/O
+        # errors carry an errno
+        if e.errno is not None:
+            raise
+        raise Corrupt("malformed compound file: %s" % e) from e
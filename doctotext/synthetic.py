@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+import io
+import random
+import struct
+from doctotext import builders
+from doctotext.builders import FibRgFcLcb97, FibRgLw97
+from doctotext.decoding import encode_compressed
+
+##############################################################
+# Writer for synthetic Word 97-2003 documents: a Compound    #
+# File holding a WordDocument stream with a FIB for any      #
+# supported nFib, a table stream with the Clx, and text      #
+# split into compressed and uncompressed pieces. Used to     #
+# exercise and benchmark the parser without real documents.  #
+##############################################################
+
+SECTOR = 512
+MINI_SECTOR = 64
+MINI_CUTOFF = 4096
+FREESECT, ENDOFCHAIN, FATSECT, DIFSECT, NOSTREAM = 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD, 0xFFFFFFFC, 0xFFFFFFFF
+
+# number of 8-byte fc/lcb pairs and cswNew for each nFib variant
+NFIB_LAYOUT = {
+    0x00C1: (0x005D, 0x0000),
+    0x00D9: (0x006C, 0x0002),
+    0x0101: (0x0088, 0x0002),
+    0x010C: (0x00A4, 0x0002),
+    0x0112: (0x00B7, 0x0005)}
+
+STORIES = tuple(name for name, _ in builders.STORIES)
+_CCP_FIELDS = tuple(field for _, field in builders.STORIES)
+
+
+def build_fib_bytes(nfib, ccps, fc_clx, lcb_clx, table='1Table', encrypted=False, fc_min=0x800):
+    """
+    @param nfib: one of NFIB_LAYOUT
+    @param ccps: character counts of the stories, in STORIES order
+    returns: FIB bytes
+    """
+    cb_rgfclcb, csw_new = NFIB_LAYOUT[nfib]
+    flags = (1 << 12) | ((table == '1Table') << 9) | (encrypted << 8)
+    base = struct.pack('<HHHHHHHIBBHHII', 0xA5EC, 0x00C1 if csw_new else nfib, 0, 0x0409, 0,
+                       flags, 0x00BF, 0, 0, 0, 0, 0, 0, 0)
+    rgw = struct.pack('<H', 14) + bytes(28)
+    lw = dict.fromkeys(FibRgLw97._fields, 0)
+    lw['cbMac'] = fc_min
+    lw.update(zip(_CCP_FIELDS, ccps))
+    rglw = struct.pack('<H', 22) + FibRgLw97._struct.pack(*[lw[k] for k in FibRgLw97._fields])
+    fclcb = dict.fromkeys(FibRgFcLcb97._fields, 0)
+    fclcb['fcClx'], fclcb['lcbClx'] = fc_clx, lcb_clx
+    rgfclcb = FibRgFcLcb97._struct.pack(*[fclcb[k] for k in FibRgFcLcb97._fields])
+    rgfclcb = struct.pack('<H', cb_rgfclcb) + rgfclcb.ljust(cb_rgfclcb * 8, b'\x00')
+    cswnew = struct.pack('<H', csw_new)
+    if csw_new:
+        cswnew += struct.pack('<H', nfib) + bytes(csw_new * 2 - 2)
+    return base + rgw + rglw + rgfclcb + cswnew
+
+
+def _ccp(text):
+    # CPs count UTF-16 code units
+    return len(text.encode('utf-16-le')) // 2
+
+
+def build_streams(stories, nfib=0x00C1, pieces=1, compressed=0.5, prcs=0, shuffle=False,
+                  encrypted=False, table='1Table', seed=0):
+    """
+    @param stories: text, or {story: text} using the names in STORIES
+    @param nfib: one of NFIB_LAYOUT
+    @param pieces: number of pieces the CP range is split into
+    @param compressed: fraction of pieces stored as 8-bit text (0 or 1 for all/none)
+    @param prcs: number of Prc entries written ahead of the Pcdt
+    @param shuffle: store pieces out of CP order, as fast saves do
+    returns: (WordDocument bytes, table stream bytes)
+    """
+    if isinstance(stories, str):
+        stories = {'main': stories}
+    text = ''.join(stories.get(name, '') for name in STORIES)
+    ccps = [_ccp(stories.get(name, '')) for name in STORIES]
+    rng = random.Random(seed)
+
+    # split CP range into pieces
+    pieces = max(1, min(pieces, len(text) or 1))
+    cuts = sorted(rng.sample(range(1, len(text)), pieces - 1)) if pieces > 1 else []
+    bounds = [0] + cuts + [len(text)]
+    flags = [rng.random() < compressed for _ in range(pieces)]
+    if compressed in (0, 1, True, False):
+        flags = [bool(compressed)] * pieces
+    order = list(range(pieces))
+    if shuffle:
+        rng.shuffle(order)
+
+    # lay piece bytes out in the WordDocument stream
+    fc_min = 0x800
+    body = bytearray()
+    fcs = [0] * pieces
+    for i in order:
+        chunk = text[bounds[i]:bounds[i + 1]]
+        if flags[i]:
+            # like Word, fall back to 16-bit text when a piece does not fit in 8 bits
+            try:
+                data = encode_compressed(chunk)
+            except UnicodeEncodeError:
+                flags[i] = False
+        if flags[i]:
+            fcs[i] = ((fc_min + len(body)) * 2) | 0x40000000
+            body += data
+        else:
+            if len(body) % 2:
+                body += b'\x00'
+            fcs[i] = fc_min + len(body)
+            body += chunk.encode('utf-16-le')
+
+    # Clx: optional Prc entries, then the Pcdt
+    clx = bytearray()
+    for i in range(prcs):
+        grpprl = bytes([0x0A, 0x08, i & 0xFF]) + bytes(rng.randrange(4))
+        clx += struct.pack('<Bh', 0x01, len(grpprl)) + grpprl
+    plcpcd = struct.pack('<%dI' % (pieces + 1), *[_ccp(text[:b]) for b in bounds])
+    for i in range(pieces):
+        plcpcd += struct.pack('<HIH', 0, fcs[i], 0)
+    clx += struct.pack('<BI', 0x02, len(plcpcd)) + plcpcd
+    table_data = bytes(0x200) + bytes(clx)
+
+    fib = build_fib_bytes(nfib, ccps, 0x200, len(clx), table=table, encrypted=encrypted, fc_min=fc_min)
+    word_data = fib.ljust(fc_min, b'\x00') + bytes(body)
+    return word_data, table_data
+
+
+def write_cfb(streams, fileobj):
+    """
+    @param streams: {name: bytes}; a name like 'ObjectPool/_1/WordDocument' also creates
+                    the storages on its path, and directory entries are laid out in
+                    the order of streams
+    @param fileobj: binary file object
+    """
+    entries = [('Root Entry', 5, b'')]
+    index = {(): 0}
+    for name in streams:
+        parts = tuple(name.split('/'))
+        for depth in range(1, len(parts)):
+            if parts[:depth] not in index:
+                index[parts[:depth]] = len(entries)
+                entries.append((parts[depth - 1], 1, b''))
+        index[parts] = len(entries)
+        entries.append((parts[-1], 2, bytes(streams[name])))
+    children = {}
+    for parts, i in index.items():
+        if parts:
+            children.setdefault(index[parts[:-1]], []).append(i)
+
+    # small streams live in the mini stream
+    ministream = bytearray()
+    minifat = []
+    starts = {}
+    for i, (name, kind, data) in enumerate(entries):
+        if kind == 2 and len(data) < MINI_CUTOFF and data:
+            count = -(-len(data) // MINI_SECTOR)
+            first = len(ministream) // MINI_SECTOR
+            starts[i] = first
+            minifat += list(range(first + 1, first + count)) + [ENDOFCHAIN]
+            ministream += data.ljust(count * MINI_SECTOR, b'\x00')
+
+    # regular sector runs: directory, minifat, ministream, large streams
+    runs = []
+    dir_count = -(-len(entries) // 4)
+    runs.append(('dir', dir_count))
+    minifat_count = -(-len(minifat) * 4 // SECTOR)
+    if minifat_count:
+        runs.append(('minifat', minifat_count))
+    if ministream:
+        runs.append(('ministream', -(-len(ministream) // SECTOR)))
+    for i, (name, kind, data) in enumerate(entries):
+        if kind == 2 and len(data) >= MINI_CUTOFF:
+            runs.append((i, -(-len(data) // SECTOR)))
+    used = sum(n for _, n in runs)
+    fat_count = difat_count = 0
+    while True:
+        need_fat = -(-(used + fat_count + difat_count) // 128)
+        need_difat = -(-max(0, need_fat - 109) // 127)
+        if (need_fat, need_difat) == (fat_count, difat_count):
+            break
+        fat_count, difat_count = need_fat, need_difat
+
+    fat = [FATSECT] * fat_count + [DIFSECT] * difat_count
+    run_start = {}
+    for key, count in runs:
+        run_start[key] = len(fat)
+        fat += list(range(len(fat) + 1, len(fat) + count)) + [ENDOFCHAIN]
+    fat += [FREESECT] * (fat_count * 128 - len(fat))
+
+    # directory
+    def tree(items):
+        if not items:
+            return NOSTREAM, {}
+        mid = len(items) // 2
+        left, lsub = tree(items[:mid])
+        right, rsub = tree(items[mid + 1:])
+        links = {items[mid]: (left, right)}
+        links.update(lsub)
+        links.update(rsub)
+        return items[mid], links
+    # one red-black tree (all black, balanced) of children per storage, in CFB name order
+    child_of, links = {}, {}
+    for parent, items in children.items():
+        items.sort(key=lambda i: (len(entries[i][0]), entries[i][0].upper()))
+        child_of[parent], sub = tree(items)
+        links.update(sub)
+    directory = bytearray()
+    for i, (name, kind, data) in enumerate(entries):
+        raw = name.encode('utf-16-le') + b'\x00\x00'
+        left, right = links.get(i, (NOSTREAM, NOSTREAM))
+        child = child_of.get(i, NOSTREAM)
+        if kind == 5:
+            start, size = (run_start['ministream'], len(ministream)) if ministream else (ENDOFCHAIN, 0)
+        elif not data:
+            start, size = ENDOFCHAIN, 0
+        elif len(data) < MINI_CUTOFF:
+            start, size = starts[i], len(data)
+        else:
+            start, size = run_start[i], len(data)
+        directory += raw.ljust(64, b'\x00') + struct.pack(
+            '<HBBIII16sIQQIQ', len(raw), kind, 1, left, right, child, bytes(16), 0, 0, 0, start, size)
+    directory += (b'\x00' * 64 + struct.pack('<HBBIII16sIQQIQ', 0, 0, 0, NOSTREAM, NOSTREAM, NOSTREAM,
+                                             bytes(16), 0, 0, 0, 0, 0)) * (dir_count * 4 - len(entries))
+
+    # header and DIFAT
+    difat = list(range(fat_count))
+    header = struct.pack('<8s16sHHHHH6sIIIIIIIII', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', bytes(16),
+                         0x003E, 0x0003, 0xFFFE, 9, 6, bytes(6), 0, fat_count, run_start['dir'], 0,
+                         MINI_CUTOFF, run_start.get('minifat', ENDOFCHAIN), minifat_count,
+                         fat_count if difat_count else ENDOFCHAIN, difat_count)
+    header += struct.pack('<109I', *(difat[:109] + [FREESECT] * (109 - len(difat[:109]))))
+    fileobj.write(header)
+    fileobj.write(struct.pack('<%dI' % len(fat), *fat))
+    rest = difat[109:]
+    for k in range(difat_count):
+        part = rest[k * 127:(k + 1) * 127]
+        part += [FREESECT] * (127 - len(part))
+        nxt = fat_count + k + 1 if k + 1 < difat_count else ENDOFCHAIN
+        fileobj.write(struct.pack('<128I', *part, nxt))
+    fileobj.write(bytes(directory))
+    if minifat_count:
+        fileobj.write(struct.pack('<%dI' % len(minifat), *minifat).ljust(minifat_count * SECTOR, b'\xff'))
+    if ministream:
+        fileobj.write(bytes(ministream).ljust(-(-len(ministream) // SECTOR) * SECTOR, b'\x00'))
+    for i, (name, kind, data) in enumerate(entries):
+        if kind == 2 and len(data) >= MINI_CUTOFF:
+            fileobj.write(data.ljust(-(-len(data) // SECTOR) * SECTOR, b'\x00'))
+
+
+def sample_text(chars: int, seed: int = 0, paragraph: int = 400):
+    """
+    returns: chars characters of cp1252-safe words, with a paragraph mark
+             roughly every `paragraph` characters and at the end
+    """
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'caf\xe9', 'na\xefve', 'doc',
+             'piece', 'table', 'stream', 'text', 'word', 'file', 'r\xe9sum\xe9']
+    parts = []
+    size = line = 0
+    while size < chars - 1:
+        word = rng.choice(words)
+        if line + len(word) >= paragraph:
+            word += '\r'
+            line = 0
+        else:
+            word += ' '
+            line += len(word)
+        parts.append(word)
+        size += len(word)
+    return ''.join(parts)[:max(chars - 1, 0)] + '\r'
+
+
+def make_doc(stories, path=None, extra_streams=None, **options):
+    """
+    @param stories: text, or {story: text}; see build_streams
+    @param path: also write the document here
+    @param extra_streams: {name: bytes} added to the root storage
+    @param options: passed to build_streams
+    returns: the .doc file as bytes
+    """
+    word_data, table_data = build_streams(stories, **options)
+    streams = {'WordDocument': word_data, options.get('table', '1Table'): table_data}
+    streams.update(extra_streams or {})
+    buffer = io.BytesIO()
+    write_cfb(streams, buffer)
+    if path is not None:
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+    return buffer.getvalue()
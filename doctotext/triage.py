@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+from collections import namedtuple
+from doctotext import builders, cfb
+from doctotext.errors import DocError
+from doctotext.sources import open_ole, open_stream
+
+WORD_IDENT = 0xA5EC
+SUPPORTED_NFIB = frozenset(builders.FCLCB_SECTIONS)
+
+# FibBase, csw, FibRgW97, cslw, then FibRgLw97 up to and including cbRgFcLcb
+_HEAD_SIZE = builders.FibBase.size + 2 + 28 + 2 + 88 + 2
+_FIBRGLW_OFFSET = builders.FibBase.size + 2 + 28 + 2
+
+# compound file header fields used to find the WordDocument stream [MS-CFB 2.2]
+_CFB_HEADER = struct.Struct('<8s22xH16xI4xI')  # magic, sector shift, first directory sector, mini cutoff
+_CFB_DIFAT = struct.Struct('<109I')
+# name, name length, type, left sibling, right sibling, child, start sector, size (low dword)
+_CFB_ENTRY = struct.Struct('<64sHBxIII36xII')
+# directory trees are ordered by name length, then by upper-cased name [MS-CFB 2.6.4]
+_WORD_KEY = (len('WordDocument'), 'WORDDOCUMENT')
+
+
+class Sniff(namedtuple('Sniff', ['supported', 'nfib', 'encrypted', 'obfuscated', 'ccp_text', 'table'])):
+    """
+    What the FIB says about a file: supported is True for unencrypted Word 97+
+    documents extract_text can read. Fields other than supported are None when
+    the file is not a Word document at all.
+    """
+    __slots__ = ()
+
+
+_NOT_WORD = Sniff(False, None, None, None, None, None)
+
+
+def sniff(source):
+    """
+    @param source: path to *.doc file, bytes-like object, mmap or binary file object
+    returns: Sniff, reading only the FIB of the WordDocument stream
+    raises: OSError if the source cannot be read, e.g. FileNotFoundError or PermissionError
+    """
+    # only format problems fall back; I/O errors such as a missing file propagate
+    try:
+        head = _read_head(source)
+    except (ValueError, struct.error):
+        head = None
+    if head is None:
+        head = _read_head_ole(source)
+    if head is None:
+        return _NOT_WORD
+    return _parse_head(*head)
+
+
+def _parse_head(head, tail):
+    """
+    @param head: first _HEAD_SIZE bytes of the WordDocument stream
+    @param tail: the 4 bytes following fibRgFcLcb (cswNew, nFibNew)
+    """
+    base = builders.FibBase.unpack_from(head, 0)
+    if base.wIdent != WORD_IDENT:
+        return _NOT_WORD
+
+    # nFib is superseded by fibRgCswNew.nFibNew when cswNew is non-zero
+    nfib = base.nFib
+    if len(tail) == 4 and builders.U16.unpack_from(tail, 0)[0]:
+        nfib = builders.U16.unpack_from(tail, 2)[0]
+
+    encrypted = bool(base.fEncrypted)
+    return Sniff(
+        supported=nfib in SUPPORTED_NFIB and not encrypted,
+        nfib=nfib, encrypted=encrypted, obfuscated=bool(base.fObfuscated),
+        ccp_text=builders.FibRgLw97.unpack_from(head, _FIBRGLW_OFFSET).ccpText,
+        table='1Table' if base.fWhichTblStm == 1 else '0Table')
+
+
+def _read_head_ole(source):
+    """returns: (head, tail) through olefile, or None if there is no WordDocument stream"""
+    try:
+        ole = open_ole(source)
+    except DocError:
+        return None
+    try:
+        stream = open_stream(ole, 'WordDocument')
+        head = stream.read(_HEAD_SIZE)
+        if len(head) < _HEAD_SIZE:
+            return None
+        stream.seek(_HEAD_SIZE + builders.U16.unpack_from(head, _HEAD_SIZE - 2)[0] * 8)
+        return head, stream.read(4)
+    except DocError:
+        return None
+    finally:
+        ole.close()
+
+
+def _read_head(source):
+    """
+    Reads the FIB head straight from the compound file sectors, without
+    loading the FAT, directory or WordDocument stream as a whole.
+    returns: (head, tail), or None where olefile has to take over
+             (mini stream storage, file objects, anything malformed)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb', buffering=0) as f:
+            def read_at(offset, size):
+                f.seek(offset)
+                return f.read(size)
+            return _read_head_from(read_at, os.fstat(f.fileno()).st_size)
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        with memoryview(source) as base, base.cast('B') as view:
+            return _read_head_from(lambda offset, size: bytes(view[offset:offset + size]), len(view))
+    return None
+
+
+def _read_head_from(read_at, file_size):
+    header = read_at(0, 512)
+    if len(header) < 512:
+        return None
+    magic, shift, dir_sector, cutoff = _CFB_HEADER.unpack_from(header, 0)
+    if magic != cfb.MAGIC or shift not in (9, 12):
+        return None
+    sector_size = 1 << shift
+    difat = list(_CFB_DIFAT.unpack_from(header, 0x4C))
+    difat_sector = builders.U32.unpack_from(header, 0x44)[0]
+    per_fat = sector_size // 4
+    # as in cfb.CompoundFile, no chain can be longer than the file has sectors
+    max_sectors = file_size // sector_size + 1
+
+    def read_sector(sector, offset, size):
+        # anything past the end of the file leaves the file to the full readers
+        data = read_at(((sector + 1) << shift) + offset, size)
+        if len(data) != size:
+            raise ValueError("sector %d runs past the end of the file" % sector)
+        return data
+
+    def next_sector(sector):
+        nonlocal difat_sector
+        index = sector // per_fat
+        # DIFAT sectors beyond the header are only read once a chain reaches them
+        while index >= len(difat) and difat_sector < cfb.MAXREGSECT and len(difat) < max_sectors:
+            entries = struct.unpack('<%dI' % per_fat, read_sector(difat_sector, 0, sector_size))
+            difat.extend(entries[:-1])
+            difat_sector = entries[-1]
+        if index >= len(difat):
+            raise ValueError("sector outside the DIFAT")
+        return builders.U32.unpack_from(read_sector(difat[index], (sector % per_fat) * 4, 4), 0)[0]
+
+    directory = [dir_sector]
+
+    def read_entry(index):
+        # directory sectors are only followed as far as the entries looked up
+        position, offset = divmod(index * 128, sector_size)
+        while len(directory) <= position:
+            if len(directory) >= max_sectors:
+                raise ValueError("directory chain longer than the file")
+            directory.append(next_sector(directory[-1]))
+        if directory[position] >= cfb.MAXREGSECT:
+            raise ValueError("directory entry %d past the end of the directory" % index)
+        return _CFB_ENTRY.unpack_from(read_sector(directory[position], offset, 128), 0)
+
+    # look WordDocument up in the root storage's tree, as cfb.CompoundFile resolves it;
+    # streams of the same name in embedded storages are never reached
+    root = read_entry(0)
+    if root[2] != cfb.ROOT:
+        return None
+    index = root[5]
+    for _ in range(max_sectors * sector_size // 128):
+        if index == cfb.NOSTREAM:
+            # not in a well-ordered tree: the full readers search the whole directory
+            return None
+        name, name_length, kind, left, right, _, start, size = read_entry(index)
+        label = name[:max(name_length - 2, 0)].decode('utf-16-le', 'replace')
+        key = (len(label), label.upper())
+        if key == _WORD_KEY:
+            break
+        index = left if _WORD_KEY < key else right
+    else:
+        raise ValueError("directory tree loops")
+    if kind != cfb.STREAM or size < max(_HEAD_SIZE, cutoff):
+        return None
+
+    def read_stream(offset, length):
+        # follow the FAT chain to the sector holding offset, then sector by sector
+        sector = start
+        for _ in range(offset // sector_size):
+            if sector >= cfb.MAXREGSECT:
+                return b''
+            sector = next_sector(sector)
+        offset %= sector_size
+        output = b''
+        for _ in range(max_sectors):
+            if sector >= cfb.MAXREGSECT:
+                break
+            output += read_sector(sector, offset, min(sector_size - offset, length - len(output)))
+            if len(output) >= length:
+                break
+            offset = 0
+            sector = next_sector(sector)
+        else:
+            raise ValueError("sector chain longer than the file")
+        return output
+
+    head = read_stream(0, _HEAD_SIZE)
+    if len(head) < _HEAD_SIZE:
+        return None
+    tail_offset = _HEAD_SIZE + builders.U16.unpack_from(head, _HEAD_SIZE - 2)[0] * 8
+    return head, read_stream(tail_offset, 4) if tail_offset + 4 <= size else b''
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import mmap
+import os
+import pathlib
+import tempfile
+import pytest
+import doctotext
+from doctotext import synthetic
+
+
+@pytest.fixture(scope='module')
+def paths(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('docs')
+    output = []
+    for i in range(24):
+        path = str(directory / ('%d.doc' % i))
+        synthetic.make_doc(synthetic.sample_text(3000, seed=i), path)
+        output.append(path)
+    return output
+
+
+def _leftovers():
+    files = set(glob.glob(os.path.join(tempfile.gettempdir(), 'doctotext-*.txt')))
+    segments = set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+    return files, segments
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('handoff', ['file', 'shm'])
+def test_handoff(paths, handoff, ordered):
+    results = list(doctotext.extract_many(paths, workers=2, chunksize=2, ordered=ordered,
+                                          handoff=handoff, handoff_threshold=1000))
+    assert sorted(result.index for result in results) == list(range(len(paths)))
+    for result in results:
+        assert result.ok and result.text == ''.join(doctotext.extract_text(result.source))
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('handoff', ['file', 'shm'])
+def test_closing_early_frees_handoffs(paths, handoff, ordered):
+    before = _leftovers()
+    results = doctotext.extract_many(paths, workers=2, chunksize=4, ordered=ordered,
+                                     handoff=handoff, handoff_threshold=1000)
+    assert next(results).ok
+    results.close()
+    after = _leftovers()
+    assert after[0] <= before[0] and after[1] <= before[1]
+
+
+def test_errors_are_reported_per_source(paths):
+    sources = [paths[0], b'x' * 2000, paths[1]]
+    results = list(doctotext.extract_many(sources, workers=2, executor='thread'))
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[1].error[0] == 'Corrupt'
+
+
+def test_unpicklable_sources(paths):
+    with open(paths[0], 'rb') as f, open(paths[1], 'rb') as g:
+        view = mmap.mmap(g.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            sources = [paths[2], f, memoryview(pathlib.Path(paths[3]).read_bytes()), view]
+            results = list(doctotext.extract_many(sources, workers=2, chunksize=1))
+        finally:
+            view.close()
+    expected = [''.join(doctotext.extract_text(paths[i])) for i in (2, 0, 3, 1)]
+    assert [result.text for result in results] == expected
+
+
+class _KillsWorker(str):
+    # unpickling this in a worker ends the process, as an OOM kill would
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_dead_worker_does_not_stop_the_batch(paths, ordered):
+    sources = paths[:3] + [_KillsWorker('boom')] + paths[3:] * 2
+    results = sorted(doctotext.extract_many(sources, workers=2, chunksize=1, ordered=ordered))
+    assert [result.index for result in results] == list(range(len(sources)))
+    assert results[3].error[0] == 'BrokenProcessPool'
+    # chunks queued before the pool noticed the death fail with it; the ones
+    # submitted after it was replaced succeed
+    failed = [result for result in results if not result.ok]
+    assert all(result.error[0] == 'BrokenProcessPool' for result in failed)
+    assert all(result.ok for result in results[-4:])
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import doctotext
+from doctotext import synthetic
+
+
+@pytest.fixture(scope='module')
+def paths(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('docs')
+    output = []
+    for i in range(3):
+        path = directory / ('%d.doc' % i)
+        synthetic.make_doc(synthetic.sample_text(3000, seed=i), str(path))
+        output.append(str(path))
+    return output
+
+
+def test_cache_returns_copies(paths, tmp_path):
+    with doctotext.Cache(str(tmp_path / 'cache.sqlite')) as cache:
+        expected = doctotext.extract_text(paths[0])
+        cache.extract_text(paths[0]).append('changed')
+        spans = cache.extract_text(paths[0])
+        spans[0] = 'changed'
+        assert cache.extract_text(paths[0]) == expected
+        assert cache.stats()['hits'] == 2
+
+
+def test_content_key_ignores_source_kind(paths):
+    cache = doctotext.Cache()
+    with open(paths[0], 'rb') as f:
+        data = f.read()
+    cache.extract_text(paths[0])
+    assert cache.extract_text(data) == doctotext.extract_text(data)
+    assert cache.extract_text(memoryview(data)) == doctotext.extract_text(data)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_disk_store_survives_reopening(paths, tmp_path):
+    with doctotext.Cache(str(tmp_path / 'cache.sqlite')) as cache:
+        expected = cache.extract_text(paths[1])
+    with doctotext.Cache(str(tmp_path / 'cache.sqlite')) as cache:
+        assert cache.extract_text(paths[1]) == expected
+        assert cache.stats()['disk_hits'] == 1
+
+
+def test_memory_lru_evicts_oldest(paths):
+    cache = doctotext.Cache(memory_bytes=10000)
+    for path in paths:
+        cache.extract_text(path)
+    assert cache.stats()['memory_entries'] == 1
+    cache.extract_text(paths[-1])
+    assert cache.memory_hits == 1 and cache.evictions == 2
+
+
+def test_stat_key_changes_with_the_file(tmp_path):
+    path = tmp_path / 'a.doc'
+    path.write_bytes(synthetic.make_doc('first\r'))
+    cache = doctotext.Cache(key='stat')
+    assert cache.extract_text(str(path)) == ['first\r']
+    path.write_bytes(synthetic.make_doc('second text\r'))
+    assert cache.extract_text(str(path)) == ['second text\r']
+    with pytest.raises(ValueError):
+        doctotext.Cache(key='other')
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import io
+import itertools
+import signal
+import struct
+import olefile
+import pytest
+import doctotext
+from doctotext import cfb, sources, synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+@pytest.fixture
+def deadline():
+    # a regression here hangs instead of failing; SIGALRM turns that into a failure
+    if not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise AssertionError("did not finish within 10 seconds")
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.alarm(10)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@pytest.mark.parametrize('backend', sources.BACKENDS)
+@pytest.mark.parametrize('nfib, compressed, pieces', list(itertools.product(
+    synthetic.NFIB_LAYOUT, (0, 0.5, 1), (1, 7))))
+def test_round_trip(monkeypatch, backend, nfib, compressed, pieces):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', backend)
+    data = synthetic.make_doc(TEXT, nfib=nfib, compressed=compressed, pieces=pieces, shuffle=True, prcs=2)
+    assert ''.join(doctotext.extract_text(data)) == TEXT
+
+
+@pytest.mark.parametrize('size', [0, 100, 4095, 4096, 70000])
+def test_streams_match_olefile(size):
+    # below 4096 bytes streams live in the mini stream, from there in regular sectors
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    data = synthetic.make_doc('outer\r', extra_streams={'Payload': payload})
+    ole, reference = cfb.CompoundFile(data), olefile.OleFileIO(data)
+    try:
+        for name in ('WordDocument', '1Table', 'Payload'):
+            assert ole.exists(name) and ole.get_size(name) == reference.get_size(name)
+            assert ole.openstream(name).read() == reference.openstream(name).read()
+        stream = ole.openstream('Payload')
+        stream.seek(size // 3)
+        assert stream.read(1000) == payload[size // 3:size // 3 + 1000]
+        assert stream.read_at(size // 2, 10) == payload[size // 2:size // 2 + 10]
+        assert not ole.exists('Missing')
+    finally:
+        ole.close()
+        reference.close()
+
+
+def self_linked_difat():
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(5000)))
+    # FAT and DIFAT sector counts far beyond the file, and DIFAT sector 0 linking to itself
+    struct.pack_into('<I', data, 0x2C, 0xFFFFFFF0)
+    struct.pack_into('<II', data, 0x44, 0, 0xFFFFFFF0)
+    struct.pack_into('<I', data, 512 + 508, 0)
+    return bytes(data)
+
+
+def test_self_linked_difat(deadline):
+    data = self_linked_difat()
+    with pytest.raises(doctotext.Corrupt):
+        cfb.CompoundFile(data)
+    for backend in sources.BACKENDS:
+        with pytest.raises(doctotext.Corrupt):
+            sources.open_ole(data, backend)
+    with pytest.raises(doctotext.Corrupt):
+        doctotext.extract_text(data, limits=doctotext.Limits(timeout=1))
+
+
+def test_difat_loop_within_the_file(deadline):
+    # plausible counts, but the DIFAT chain revisits its first sector
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(60000)))
+    struct.pack_into('<I', data, 0x2C, 240)
+    struct.pack_into('<II', data, 0x44, 0, 200)
+    struct.pack_into('<I', data, 512 + 508, 0)
+    with pytest.raises(doctotext.Corrupt, match='loops'):
+        cfb.CompoundFile(bytes(data))
+
+
+def test_deeply_nested_storages():
+    deep = '/'.join(['S'] * 1500 + ['x'])
+    data = synthetic.make_doc('outer\r', extra_streams={deep: b'inner'})
+    ole = cfb.CompoundFile(data)
+    try:
+        assert ole.openstream(deep).read() == b'inner'
+    finally:
+        ole.close()
+    assert doctotext.extract_text(data) == ['outer\r']
+    assert doctotext.sniff(io.BytesIO(data)).supported
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import doctotext
+from doctotext import chunking, synthetic
+
+# astral characters make CPs (UTF-16 code units) differ from str indexes
+TEXT = synthetic.sample_text(30000, seed=3, paragraph=150) + 'needle \U0001F600 needle\r' * 3
+
+
+def test_iter_paragraphs_counts_code_units():
+    segments = [(0, 6, 'ab\rcd'), (6, 11, '\U0001F600e\rf\r')]
+    assert list(chunking.iter_paragraphs(segments, 100)) == [
+        ('ab\r', 0, 3), ('cd\U0001F600e\r', 3, 9), ('f\r', 9, 11)]
+    # a paragraph longer than max_chars is split
+    assert [p[0] for p in chunking.iter_paragraphs([(0, 8, 'abcdefg\r')], 3)] == ['abc', 'def', 'g\r']
+
+
+@pytest.mark.parametrize('max_chars, overlap', [(500, 0), (2000, 300), (50, 0)])
+def test_chunk_offsets_match_extract_range(max_chars, overlap):
+    data = synthetic.make_doc(TEXT, pieces=30, compressed=0.5, shuffle=True)
+    chunks = list(doctotext.iter_chunks(data, max_chars, overlap=overlap, chunk_chars=777))
+    with doctotext.Document(data) as document:
+        for chunk in chunks:
+            assert len(chunk.text) <= max_chars
+            assert document.extract_range(chunk.cp_start, chunk.cp_end) == chunk.text
+    if not overlap:
+        assert ''.join(chunk.text for chunk in chunks) == TEXT
+
+
+def test_overlap_repeats_whole_paragraphs():
+    data = synthetic.make_doc(''.join('paragraph %d\r' % i for i in range(50)))
+    chunks = list(doctotext.iter_chunks(data, 60, overlap=30))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.cp_start < previous.cp_end
+        assert previous.text.endswith(chunk.text[:previous.cp_end - chunk.cp_start])
+    with pytest.raises(ValueError):
+        list(doctotext.iter_chunks(data, 0))
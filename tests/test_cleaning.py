@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+import re
+import pytest
+import doctotext
+from doctotext import cleaning, synthetic
+
+FIELDS = ('intro \x13 HYPERLINK "x" \x14link text\x15 stray\x15 and\x14 marks '
+          '\x13 REF a \x13 PAGE \x14 3\x15 \x14nested result\x15 end\x07\x0b\x1e\x1f\r')
+
+
+def test_clean():
+    assert cleaning.clean('intro \x13 HYPERLINK "x" \x14link text\x15 end\x07\x0b\x1e\x1f\r') == \
+        'intro link text end\t\n-\n'
+    # an instruction without a separator leaves no result behind
+    assert cleaning.clean('a\x13 PAGE \x15b\r') == 'ab\n'
+
+
+@pytest.mark.parametrize('text', [FIELDS * 2, 'stray \x14 marks \x15 only\r'])
+def test_cleaner_is_independent_of_split_point(text):
+    expected = cleaning.clean(text)
+    for cut in range(len(text) + 1):
+        cleaner = cleaning.Cleaner()
+        assert cleaner.feed(text[:cut]) + cleaner.feed(text[cut:]) == expected
+    assert not re.search('[\x13\x14\x15]', expected)
+
+
+def test_clean_iter_text_matches_clean_extract():
+    data = synthetic.make_doc(FIELDS * 50, pieces=20, compressed=0.5)
+    expected = ''.join(doctotext.extract_text(data, clean=True))
+    assert expected == cleaning.clean(FIELDS * 50)
+    for chunk_chars in (1, 7, 64, 0x10000):
+        assert ''.join(doctotext.iter_text(data, chunk_chars, clean=True)) == expected
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import pytest
+import doctotext
+from doctotext import synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+@pytest.mark.parametrize('nfib, compressed', list(itertools.product(synthetic.NFIB_LAYOUT, (0, 1))))
+def test_document(nfib, compressed):
+    data = synthetic.make_doc(TEXT, nfib=nfib, compressed=compressed, pieces=7, shuffle=True)
+    with doctotext.Document(data) as document:
+        assert document.fib.nFib == nfib
+        assert document.text == TEXT
+        assert document.metadata['nfib'] == nfib
+        assert document.metadata['saved'] is None
+
+
+def test_parsed_parts_are_cached():
+    data = synthetic.make_doc(TEXT, pieces=7)
+    with doctotext.Document(data) as document:
+        assert document.fib is document.fib
+        assert document.piece_table is document.piece_table
+        assert document.metadata is document.metadata
+        streamed = ''.join(document.iter_text(500))
+        assert 'text' not in document.__dict__
+        assert document.text is document.text
+        # once decoded, iter_text() slices the cached text
+        assert list(document.iter_text(500)) == [TEXT[i:i + 500] for i in range(0, len(TEXT), 500)]
+    assert streamed == TEXT
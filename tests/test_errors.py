@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import io
+import random
+import struct
+import pytest
+import doctotext
+from doctotext import sources, synthetic
+
+BASES = [synthetic.make_doc(synthetic.sample_text(chars, seed=chars), pieces=pieces, compressed=compressed)
+         for chars, pieces, compressed in ((3000, 1, 1), (9000, 5, 0.5), (700, 3, 0))]
+
+READERS = {
+    'extract_text': lambda data: doctotext.extract_text(data),
+    'iter_text': lambda data: list(doctotext.iter_text(data, 500)),
+    'stories': lambda data: doctotext.extract_text(data, stories='all'),
+    'search': lambda data: doctotext.search(data, 'lorem'),
+    'iter_chunks': lambda data: list(doctotext.iter_chunks(data, 300)),
+    'metadata': lambda data: doctotext.Document(data).metadata,
+}
+
+
+def mutations(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        data = bytearray(rng.choice(BASES))
+        if rng.random() < 0.2:
+            yield bytes(data[:rng.randrange(len(data))])
+            continue
+        for _ in range(rng.randrange(1, 20)):
+            i = rng.randrange(len(data))
+            data[i:i + 4] = rng.randbytes(4)
+        yield bytes(data)
+
+
+@pytest.mark.parametrize('backend', sources.BACKENDS)
+@pytest.mark.parametrize('reader', READERS)
+def test_malformed_inputs_raise_doc_error(monkeypatch, backend, reader):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', backend)
+    for data in mutations(seed=sorted(READERS).index(reader), count=150):
+        try:
+            READERS[reader](data)
+        except doctotext.DocError:
+            pass
+        # sniff never raises on malformed input
+        doctotext.sniff(data)
+
+
+@pytest.mark.parametrize('backend', sources.BACKENDS)
+@pytest.mark.parametrize('data', [b'', b'x' * 2000, b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1' + bytes(600)])
+def test_not_a_compound_file(monkeypatch, backend, data):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', backend)
+    with pytest.raises(doctotext.Corrupt):
+        doctotext.extract_text(data)
+    with pytest.raises(doctotext.Corrupt):
+        doctotext.Document(data)
+
+
+def test_missing_file_is_not_corrupt(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        doctotext.extract_text(str(tmp_path / 'missing.doc'))
+
+
+@pytest.mark.parametrize('size', [0, 40, 160])
+def test_short_word_stream(size):
+    word_data, table_data = synthetic.build_streams('hello\r')
+    buffer = io.BytesIO()
+    synthetic.write_cfb({'WordDocument': word_data[:size], '1Table': table_data}, buffer)
+    for reader in ('extract_text', 'iter_text', 'metadata'):
+        with pytest.raises(doctotext.Corrupt):
+            READERS[reader](buffer.getvalue())
+
+
+def _entry_offset(data, name):
+    # start sector field of the directory entry named `name`
+    return data.find(name.encode('utf-16-le')) + 116
+
+
+def test_sector_chain_past_end_of_file():
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(20000)))
+    sector = len(data) // 512 + 10
+    struct.pack_into('<I', data, _entry_offset(data, 'WordDocument'), sector)
+    fat = struct.unpack_from('<I', data, 0x4C)[0]
+    struct.pack_into('<I', data, (fat + 1) * 512 + sector * 4, sector)
+    with pytest.raises(doctotext.Corrupt):
+        doctotext.extract_text(bytes(data))
+
+
+
+@pytest.mark.parametrize('backend', sources.BACKENDS)
+def test_encrypted(monkeypatch, backend):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', backend)
+    with pytest.raises(doctotext.Encrypted):
+        doctotext.extract_text(synthetic.make_doc('secret\r', encrypted=True))
+
+
+def test_pre_word_97_is_unsupported():
+    word_data, table_data = synthetic.build_streams('hello\r')
+    buffer = io.BytesIO()
+    synthetic.write_cfb({'WordDocument': word_data[:2] + struct.pack('<H', 0x0065) + word_data[4:],
+                         '1Table': table_data}, buffer)
+    with pytest.raises(doctotext.UnsupportedVersion):
+        doctotext.extract_text(buffer.getvalue())
+
+
+def test_limits():
+    data = synthetic.make_doc(synthetic.sample_text(20000), pieces=50)
+    with pytest.raises(doctotext.LimitExceeded):
+        doctotext.extract_text(data, limits=doctotext.Limits(max_chars=1000))
+    with pytest.raises(doctotext.LimitExceeded):
+        doctotext.extract_text(data, limits=doctotext.Limits(max_pieces=10))
+    with pytest.raises(doctotext.LimitExceeded):
+        doctotext.extract_text(data, limits=doctotext.Limits(max_stream_bytes=4096))
+    with pytest.raises(doctotext.LimitExceeded):
+        list(doctotext.iter_text(data, 100, limits=doctotext.Limits(timeout=0)))
+
+
+def test_olefile_messages_without_errno_are_corrupt(monkeypatch):
+    # olefile raises a bare IOError('incorrect DIFAT') for this header
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(5000)))
+    struct.pack_into('<III', data, 0x44, 0, 0xFFFFFFF0, 0)
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', 'olefile')
+    with pytest.raises(doctotext.Corrupt):
+        doctotext.extract_text(bytes(data))
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+import io
+import pytest
+import doctotext
+from doctotext import synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+@pytest.mark.parametrize('chunk_chars', [1, 500, 0x10000])
+def test_iter_text_matches_extract_text(chunk_chars):
+    data = synthetic.make_doc(TEXT, compressed=0.5, pieces=7, shuffle=True)
+    chunks = list(doctotext.iter_text(data, chunk_chars=chunk_chars))
+    assert ''.join(chunks) == TEXT
+    assert all(0 < len(chunk) <= max(chunk_chars, 2) for chunk in chunks)
+
+
+def test_extract_to():
+    data = synthetic.make_doc(TEXT, pieces=3)
+    output = io.BytesIO()
+    assert doctotext.extract_to(data, output, chunk_chars=100) == len(TEXT)
+    assert output.getvalue().decode('utf-8') == TEXT
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import doctotext
+from doctotext import synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+UNITS = TEXT.encode('utf-16-le')
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.make_doc(TEXT, pieces=9, compressed=0.5, shuffle=True)
+
+
+@pytest.mark.parametrize('start, end', [(0, 10), (100, 3000), (5990, len(UNITS) // 2), (0, 1 << 20),
+                                        (-5, 3), (50, 50), (60, 40)])
+def test_extract_range(data, start, end):
+    expected = UNITS[max(start, 0) * 2:end * 2].decode('utf-16-le', 'surrogatepass')
+    with doctotext.Document(data) as document:
+        assert document.extract_range(start, end) == expected
+        assert doctotext.extract_range(document, start, end) == expected
+    assert doctotext.extract_range(data, start, end) == expected
+
+
+def test_piece_index(data):
+    with doctotext.Document(data) as document:
+        cp = document.piece_table.cp
+        assert [document.piece_index(c) for c in cp[:-1]] == list(range(len(cp) - 1))
+        with pytest.raises(IndexError):
+            document.piece_index(cp[-1])
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import re
+import pytest
+import doctotext
+from doctotext import synthetic
+
+# astral characters make CPs (UTF-16 code units) differ from str indexes
+TEXT = synthetic.sample_text(30000, seed=3, paragraph=150) + 'needle \U0001F600 needle\r' * 3
+
+
+@pytest.mark.parametrize('chunk_chars', [100, 1000, 0x10000])
+def test_search_offsets_match_extract_range(chunk_chars):
+    data = synthetic.make_doc(TEXT, pieces=30, compressed=0.5, shuffle=True)
+    patterns = ['needle', re.compile(r'caf\w'), re.compile(r'\U0001F600 n')]
+    hits = doctotext.search(data, patterns, window=64, chunk_chars=chunk_chars)
+    assert len([hit for hit in hits if hit.pattern == 'needle']) == TEXT.count('needle')
+    assert len([hit for hit in hits if hit.pattern is patterns[1]]) == len(re.findall(r'caf\w', TEXT))
+    with doctotext.Document(data) as document:
+        for hit in hits:
+            assert document.extract_range(hit.cp_start, hit.cp_end) == hit.text
+    assert [hit.cp_start for hit in hits] == sorted(hit.cp_start for hit in hits)
+    first = next(hit for hit in hits if hit.pattern == 'needle')
+    assert doctotext.search(data, 'needle', first_only=True) == [first]
+
+
+def test_ignore_case():
+    data = synthetic.make_doc('Needle in a NEEDLE stack\r')
+    assert [hit.cp_start for hit in doctotext.search(data, 'needle', ignore_case=True)] == [0, 12]
+    assert doctotext.search(data, 'needle') == []
+
+
+def test_search_many(tmp_path):
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / ('%d.doc' % i))
+        synthetic.make_doc(synthetic.sample_text(3000, seed=i), path)
+        paths.append(path)
+    results = list(doctotext.search_many(paths + [b'x' * 2000], 'lorem', first_only=True, workers=2))
+    assert [result.index for result in results] == list(range(5))
+    for result in results[:4]:
+        assert result.ok and len(result.hits) == 1
+    assert results[4].error[0] == 'Corrupt'
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import os
+import signal
+import socket
+import pytest
+import doctotext
+from doctotext import synthetic
+from doctotext import server
+from doctotext.server import Client, Server
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'),
+                                reason='the daemon needs fork() and Unix sockets')
+
+
+@pytest.fixture
+def address():
+    # Unix socket paths are limited to about 100 bytes
+    path = os.path.join('/tmp', 'doctotext-test-%d.sock' % os.getpid())
+    yield path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def test_frames():
+    left, right = socket.socketpair()
+    with left, right:
+        for data in (b'', b'small', bytes(0x20000)):
+            server.send_frame(left, data)
+            assert server.recv_frame(right) == data
+        server.send_frame(left, b'x' * 100)
+        with pytest.raises(ValueError):
+            server.recv_frame(right, max_size=99)
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(b'\x00\x00')
+        left.shutdown(socket.SHUT_WR)
+        with pytest.raises(ConnectionError):
+            server.recv_frame(right)
+        # a close between frames is not an error
+        assert server.recv_frame(right) is None
+
+
+def test_bind_refuses_regular_file(tmp_path):
+    path = tmp_path / 'precious.txt'
+    path.write_text('keep me')
+    with pytest.raises(FileExistsError):
+        Server(str(path)).bind()
+    assert path.read_text() == 'keep me'
+
+
+def test_main_reports_bind_errors(tmp_path, capsys):
+    path = tmp_path / 'precious.txt'
+    path.write_text('keep me')
+    assert server.main(['--socket', str(path)]) == 1
+    assert 'cannot listen' in capsys.readouterr().err
+    assert path.read_text() == 'keep me'
+
+
+def test_bind_refuses_live_socket_and_replaces_stale_one(address):
+    live = Server(address)
+    live.bind()
+    try:
+        with pytest.raises(OSError):
+            Server(address).bind()
+    finally:
+        # closing the socket without unlinking it leaves a stale file behind
+        live._sock.close()
+        live._sock = None
+    assert os.path.exists(address)
+    stale = Server(address)
+    assert stale.bind() == address
+    stale.close()
+    assert not os.path.exists(address)
+
+
+def test_serve(address, tmp_path):
+    documents = [synthetic.make_doc(synthetic.sample_text(5000, seed=i), pieces=3) for i in range(3)]
+    path = tmp_path / 'a.doc'
+    path.write_bytes(documents[0])
+
+    server = Server(address, workers=2, max_jobs=2)
+    server.bind()
+    pid = os.fork()
+    if not pid:
+        code = 1
+        try:
+            server.serve_forever()
+            code = 0
+        finally:
+            os._exit(code)
+    server._sock.close()
+    try:
+        with Client(address, timeout=30) as client:
+            assert client.health()['ok']
+            for i in range(7):
+                response = client.extract(data=documents[i % 3])
+                assert response['ok'] and response['text'] == ''.join(doctotext.extract_text(documents[i % 3]))
+            assert client.extract(path=str(path))['nfib'] == 0x00C1
+            response = client.extract(data=b'x' * 2000)
+            assert not response['ok'] and response['error'] == 'Corrupt'
+            assert client.stats()['doctotext_worker_restarts_total'] >= 1
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert not os.path.exists(address)
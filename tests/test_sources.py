@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+import pytest
+import doctotext
+from doctotext import sources, synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+@pytest.fixture(params=sources.BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('kind', ['bytes', 'bytearray', 'memoryview', 'path', 'file', 'mmap'])
+def test_sources(backend, kind, tmp_path):
+    data = synthetic.make_doc(TEXT, pieces=3)
+    path = tmp_path / 'a.doc'
+    path.write_bytes(data)
+    with open(path, 'rb') as f:
+        source = {'bytes': lambda: data, 'bytearray': lambda: bytearray(data),
+                  'memoryview': lambda: memoryview(data), 'path': lambda: str(path),
+                  'file': lambda: f, 'mmap': lambda: mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)}[kind]()
+        try:
+            assert ''.join(doctotext.extract_text(source)) == TEXT
+        finally:
+            if kind == 'mmap':
+                source.close()
+
+
+def test_unsupported_source_type():
+    with pytest.raises(TypeError):
+        doctotext.extract_text(12345)
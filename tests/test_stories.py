@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import doctotext
+from doctotext import synthetic
+
+STORIES = {'main': 'body text\r', 'footnotes': 'a note\r', 'headers': 'page header\r'}
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic.make_doc(STORIES, pieces=4)
+
+
+def test_all_stories(data):
+    output = doctotext.extract_text(data, stories='all')
+    for name, text in STORIES.items():
+        assert output[name] == text
+    assert output['comments'] == output['endnotes'] == ''
+
+
+def test_selected_stories(data):
+    assert doctotext.extract_text(data, stories='footnotes') == {'footnotes': 'a note\r'}
+    assert doctotext.extract_text(data, stories=['main', 'headers']) == {
+        'main': 'body text\r', 'headers': 'page header\r'}
+    # without stories=, the whole text stream is returned as before
+    assert ''.join(doctotext.extract_text(data)) == ''.join(STORIES.values())
+
+
+def test_unknown_story(data):
+    with pytest.raises(ValueError):
+        doctotext.extract_text(data, stories=['main', 'marginalia'])
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import itertools
+import json
+import os
+import olefile
+import pytest
+import doctotext
+from doctotext import sources, synthetic
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+@pytest.mark.parametrize('nfib, compressed, pieces', list(itertools.product(
+    synthetic.NFIB_LAYOUT, (0, 0.5, 1), (1, 7))))
+def test_round_trip(nfib, compressed, pieces):
+    data = synthetic.make_doc(TEXT, nfib=nfib, compressed=compressed, pieces=pieces, shuffle=True, prcs=2)
+    assert ''.join(doctotext.extract_text(data)) == TEXT
+    assert doctotext.sniff(data).nfib == nfib
+
+
+def test_nested_storages():
+    data = synthetic.make_doc('outer\r', extra_streams={
+        'ObjectPool/_1/Contents': b'a' * 5000, 'ObjectPool/_1/x': b'b', 'ObjectPool/_2/y': b'c'})
+    ole = olefile.OleFileIO(data)
+    try:
+        assert sorted(ole.listdir()) == [['1Table'], ['ObjectPool', '_1', 'Contents'], ['ObjectPool', '_1', 'x'],
+                                         ['ObjectPool', '_2', 'y'], ['WordDocument']]
+        assert ole.openstream('ObjectPool/_1/Contents').read() == b'a' * 5000
+    finally:
+        ole.close()
+
+
+def test_benchmark_runs(tmp_path, capsys, monkeypatch):
+    # bench.main() sets the default backend from --backend
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', sources.DEFAULT_BACKEND)
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'bench.py')
+    spec = importlib.util.spec_from_file_location('bench', path)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    output = tmp_path / 'rows.json'
+    bench.main(['--nfib', '0x00C1', '0x0112', '--pieces', '1', '10', '--compressed', '0.5',
+                '--chars', '2000', '--repeat', '1', '--json', str(output)])
+    rows = json.loads(output.read_text())
+    assert [(row['nfib'], row['pieces']) for row in rows] == [
+        ('0x00C1', 1), ('0x00C1', 10), ('0x0112', 1), ('0x0112', 10)]
+    assert all(row['extract_text'] > 0 and row['peak_iter'] > 0 for row in rows)
+    assert len(capsys.readouterr().out.splitlines()) == len(rows) + 1
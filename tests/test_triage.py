@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import struct
+import pytest
+import doctotext
+from doctotext import sources, synthetic, triage
+
+TEXT = synthetic.sample_text(6000, seed=1) + 'caf\xe9 – 中文 \U0001F600\r'
+
+
+def embedded_document(outer_name='WordDocument'):
+    """returns: a 0x00C1 document whose directory lists an embedded 0x0112 one first"""
+    outer = synthetic.build_streams(synthetic.sample_text(8000), nfib=0x00C1)
+    inner = synthetic.build_streams(synthetic.sample_text(5400), nfib=0x0112)
+    buffer = io.BytesIO()
+    synthetic.write_cfb({'ObjectPool/_1/WordDocument': inner[0], 'ObjectPool/_1/1Table': inner[1],
+                         outer_name: outer[0], '1Table': outer[1]}, buffer)
+    return buffer.getvalue()
+
+
+def corrupt_fat_entry(data, sector, value):
+    fat = struct.unpack_from('<I', data, 0x4C)[0]
+    struct.pack_into('<I', data, (fat + 1) * 512 + sector * 4, value)
+
+
+@pytest.mark.parametrize('backend', sources.BACKENDS)
+def test_sniff(monkeypatch, backend):
+    monkeypatch.setattr(sources, 'DEFAULT_BACKEND', backend)
+    data = synthetic.make_doc(TEXT, nfib=0x0112)
+    assert doctotext.sniff(data) == (True, 0x0112, False, False, len(TEXT.encode('utf-16-le')) // 2, '1Table')
+    assert not doctotext.sniff(synthetic.make_doc(TEXT, encrypted=True)).supported
+    assert doctotext.sniff(b'not a document' * 100).nfib is None
+
+
+def test_word_stream_past_end_of_file():
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(20000)))
+    sector = len(data) // 512 + 10
+    struct.pack_into('<I', data, data.find('WordDocument'.encode('utf-16-le')) + 116, sector)
+    corrupt_fat_entry(data, sector, sector)
+    assert not doctotext.sniff(bytes(data)).supported
+
+
+def test_cyclic_directory_chain():
+    data = bytearray(synthetic.make_doc(synthetic.sample_text(20000)))
+    data[data.find('WordDocument'.encode('utf-16-le'))] = ord('X')
+    directory = struct.unpack_from('<I', data, 0x30)[0]
+    corrupt_fat_entry(data, directory, directory)
+    assert doctotext.sniff(bytes(data)).nfib is None
+
+
+@pytest.mark.parametrize('outer_name', ['WordDocument', 'WORDDOCUMENT', 'worddocument'])
+def test_sniff_reads_the_root_word_stream(outer_name):
+    data = embedded_document(outer_name)
+    # the header-only path handles these files itself
+    assert triage._read_head(data) is not None
+    sniffed = doctotext.sniff(data)
+    assert (sniffed.nfib, sniffed.ccp_text) == (0x00C1, 8000)
+    assert doctotext.sniff(io.BytesIO(data)) == sniffed
+    assert len(''.join(doctotext.extract_text(data))) == 8000
+
+
+def test_sniff_reports_io_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        doctotext.sniff(str(tmp_path / 'missing.doc'))
+    with pytest.raises(IsADirectoryError):
+        doctotext.sniff(str(tmp_path))
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() == 0, reason='root can read any file')
+def test_sniff_reports_permission_errors(tmp_path):
+    path = tmp_path / 'locked.doc'
+    path.write_bytes(synthetic.make_doc('text\r'))
+    path.chmod(0)
+    with pytest.raises(PermissionError):
+        doctotext.sniff(str(path))
+
+
+def test_sniff_not_a_word_file(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b'plain text' * 200)
+    assert doctotext.sniff(str(path)) == triage.Sniff(False, None, None, None, None, None)